@@ -1,4 +1,8 @@
-def solve_grids(grids, strips, outlines_per_row):
+import collections
+import io
+import multiprocessing
+
+def solve_grids(grids, strips, outlines_per_row, backend = 'bitboard', precheck = True, cache = None, reasons = None):
     """Function for solving grids for puzzle Black and White from MUMS Puzzle Hunt 2010 competition.
        English - https://wondrousnet.blogspot.com/2024/09/solution-to-puzzle-black-and-white.html
        Russian - https://wondrousnet.blogspot.com/2024/09/black-and-white.html
@@ -8,6 +12,17 @@ def solve_grids(grids, strips, outlines_per_row):
            strips - tuple of strings, where each string represent one strip;
            each symbol of a string denote colour of the corresponding cell of a strip ('w' for white and 'b' for black).
            outlines_per_row - integer: amount of outlines of placings in one row of output.
+           backend - string: search that is used to place the strips:
+               'bitboard' - depth-first search, where the grid, its colours and occupied cells are represented as integer bitmasks;
+               'dfs' - depth-first search, where the grid is represented as a dictionary and occupied cells as a tuple;
+               'dlx' - Algorithm X with Dancing Links for the exact cover problem, where the strips and the cells are items
+               and the search each time chooses the item with the fewest remaining options.
+           precheck - boolean: if True, then grids, that are rejected by get_rejection_reason, are not searched.
+           cache - dictionary, created by create_solution_cache, or None: if it is given, then grids, that are the same
+           up to rotation, reflection or inversion of colours, are searched only once.
+           reasons - dictionary or None: if it is given, then the reason of rejection of a grid by get_rejection_reason
+           is stored in it with the index of the grid in grids as the key, so that rejected grids are distinguished
+           from grids, that are searched without success.
        Output:
            If all grids are solved, then the function will return string of outlines of all placings,
            consisted of bars, underscores and spaces, with outlines_per_row outlines in one row;
@@ -16,25 +31,433 @@ def solve_grids(grids, strips, outlines_per_row):
     num_cols = len(grids[0][0])
     # sorting strips according to length in decreasing order to make the problem easier
     strips = tuple(sorted(strips,key = len,reverse = True))
-    outlines = ()
-    for grid_values in grids:
-        # represent a grid as a dictionary for search
-        grid = {}
-        for row in range(num_rows):
-            for col in range(num_cols):
-                grid[(col,row)] = grid_values[row][col]
-        # try to find placing with depth-first search
-        placing = depth_first_search(grid, num_cols, num_rows, strips,(), ())
+    if backend not in ('bitboard', 'dfs', 'dlx'):
+        raise ValueError("Unknown backend: " + str(backend))
+    outlines = []
+    for (index, grid_values) in enumerate(grids):
+        if precheck:
+            reason = get_rejection_reason(grid_values, strips)
+            if reason is not None:
+                if reasons is not None:
+                    reasons[index] = reason
+                return False
+        # grid is already checked, so it is searched without the check
+        if cache is None:
+            placing = solve_grid(grid_values, num_cols, num_rows, strips, backend, False)
+        else:
+            placing = solve_grid_with_cache(grid_values, strips, backend, False, cache)
         if placing:
             # form outline of a placing
             outline = get_placing_outline(placing, num_cols, num_rows)
-            outlines += (outline,)
+            outlines.append(outline)
         else:
             return False
     # combine outlines
     output = get_output(outlines, outlines_per_row)
     return output
         
+def solve_grid(grid_values, num_cols, num_rows, strips, backend, precheck = True):
+    """Function that finds placing of the strips on one grid with the given search backend.
+       Input:
+           grid_values - tuple of strings, where each string represent one row of the grid;
+           each symbol of a string denote colour of the corresponding cell of the grid ('w' for white and 'b' for black).
+           num_cols - integer: number of columns in the grid.
+           num_rows - integer: number of rows in the grid.
+           strips - tuple of strings, where each string represent one strip, in the order in which strips should be placed;
+           each symbol of a string denote colour of the corresponding cell of the strip ('w' for white and 'b' for black).
+           backend - string: 'bitboard', 'dfs' or 'dlx' (see solve_grids).
+           precheck - boolean: if True, then the grid is not searched, if it is rejected by get_rejection_reason.
+       Output:
+           If search is successful, the function will return corresponding placing (see depth_first_search);
+           otherwise the function will return False."""
+    if precheck and get_rejection_reason(grid_values, strips) is not None:
+        return False
+    if backend == 'dfs':
+        # represent a grid as a dictionary for search
+        grid = {}
+        for row in range(num_rows):
+            for col in range(num_cols):
+                grid[(col,row)] = grid_values[row][col]
+        # try to find placing with depth-first search
+        return depth_first_search(grid, num_cols, num_rows, strips,(), ())
+    # possible positions of the strips are the same for all grids
+    strips_placements = tuple(get_placement_index(strip, num_cols, num_rows)['placements'] for strip in strips)
+    # represent black cells of a grid as a bitmask for search
+    black_cells = get_grid_bitboard(grid_values, num_cols, num_rows)
+    if backend == 'bitboard':
+        return bitboard_depth_first_search(black_cells, strips_placements, 0, ())
+    elif backend == 'dlx':
+        return dancing_links_search(black_cells, strips_placements, num_cols * num_rows)
+    raise ValueError("Unknown backend: " + str(backend))
+
+def get_rejection_reason(grid_values, strips):
+    """Function that quickly checks, whether the strips can't be placed on the grid, before search.
+       It checks number of cells and colours of the strips and the grid, that every strip and cell have possible placements,
+       and places strips, that have only one possible placement, or that are the only way to cover some cell.
+       Input:
+           grid_values - tuple of strings, where each string represent one row of the grid;
+           each symbol of a string denote colour of the corresponding cell of the grid ('w' for white and 'b' for black).
+           strips - tuple of strings, where each string represent one strip;
+           each symbol of a string denote colour of the corresponding cell of a strip ('w' for white and 'b' for black).
+       Output:
+           if the strips can't be placed on the grid, then the function will return string with the reason of it;
+           otherwise the function will return None (but it doesn't mean that the strips can be placed)."""
+    num_rows = len(grid_values)
+    num_cols = len(grid_values[0])
+    num_cells = num_cols * num_rows
+    # compare number of cells and colours
+    grid_black = sum(row_values.count('b') for row_values in grid_values)
+    strips_black = sum(strip.count('b') for strip in strips)
+    strips_white = sum(strip.count('w') for strip in strips)
+    if strips_black + strips_white > num_cells:
+        return "Strips have " + str(strips_black + strips_white) + " cells, but the grid has only " + str(num_cells) + " cells"
+    if strips_black > grid_black:
+        return "Strips have " + str(strips_black) + " black cells, but the grid has only " + str(grid_black) + " black cells"
+    if strips_white > num_cells - grid_black:
+        return "Strips have " + str(strips_white) + " white cells, but the grid has only " + str(num_cells - grid_black) + " white cells"
+    num_free_cells = num_cells - strips_black - strips_white
+    # find placements with the same colours as the grid
+    black_cells = get_grid_bitboard(grid_values, num_cols, num_rows)
+    strips_options = []
+    for strip in strips:
+        options = []
+        for (position, representation, cells, black_cells_of_strip) in get_placement_index(strip, num_cols, num_rows)['placements']:
+            if cells & black_cells == black_cells_of_strip and (cells, black_cells_of_strip) not in options:
+                options.append((cells, black_cells_of_strip))
+        if not options:
+            return "Strip '" + strip + "' has no possible placement"
+        strips_options.append(options)
+    # place strips and mark free cells, while it is forced
+    unplaced_strips = list(range(len(strips)))
+    occupied_cells = 0
+    free_cells = 0
+    changed = True
+    while changed and unplaced_strips:
+        changed = False
+        # remove placements, that intersect with placed strips
+        for strip_index in unplaced_strips:
+            strips_options[strip_index] = [option for option in strips_options[strip_index] if option[0] & occupied_cells == 0]
+            if not strips_options[strip_index]:
+                return "Strip '" + strips[strip_index] + "' has no possible placement after forced placements"
+        # strip with only one placement is placed
+        for strip_index in unplaced_strips:
+            if len(strips_options[strip_index]) == 1:
+                cells = strips_options[strip_index][0][0]
+                if cells & occupied_cells:
+                    return "Strip '" + strips[strip_index] + "' has no possible placement after forced placements"
+                occupied_cells |= cells
+                unplaced_strips.remove(strip_index)
+                changed = True
+                break
+        if changed:
+            continue
+        # find placements, that cover each cell
+        cells_options = {}
+        for strip_index in unplaced_strips:
+            for option in strips_options[strip_index]:
+                remaining_cells = option[0]
+                while remaining_cells:
+                    lowest_cell = remaining_cells & -remaining_cells
+                    cell_options = cells_options.setdefault(lowest_cell, {})
+                    # the same placements of the same strips are counted once
+                    cell_options.setdefault(option, strip_index)
+                    remaining_cells ^= lowest_cell
+        for cell_index in range(num_cells):
+            cell = 1 << cell_index
+            if cell & (occupied_cells | free_cells):
+                continue
+            if cell not in cells_options:
+                # cell can't be covered, so it should remain free
+                if num_free_cells == 0:
+                    return "Cell " + str((cell_index % num_cols, cell_index // num_cols)) + " can't be covered by any strip"
+                num_free_cells -= 1
+                free_cells |= cell
+                changed = True
+            elif len(cells_options[cell]) == 1 and num_free_cells == 0:
+                # cell can be covered only by one placement, so that placement is forced
+                ((option, strip_index),) = cells_options[cell].items()
+                strips_options[strip_index] = [option]
+                changed = True
+                break
+    return None
+
+def iter_placings(grid_values, strips):
+    """Function that generates all placings of the strips on the grid.
+       Input:
+           grid_values - tuple of strings, where each string represent one row of the grid;
+           each symbol of a string denote colour of the corresponding cell of the grid ('w' for white and 'b' for black).
+           strips - tuple of strings, where each string represent one strip;
+           each symbol of a string denote colour of the corresponding cell of a strip ('w' for white and 'b' for black).
+       Output:
+           generator that will generate placings (see depth_first_search), where strips are in the same order as in solve_grids;
+           placings, that differ only by the order of the same strips, are generated once."""
+    num_rows = len(grid_values)
+    num_cols = len(grid_values[0])
+    strips = tuple(sorted(strips,key = len,reverse = True))
+    strips_placements = tuple(get_placement_index(strip, num_cols, num_rows)['placements'] for strip in strips)
+    black_cells = get_grid_bitboard(grid_values, num_cols, num_rows)
+    return iter_dancing_links_placings(black_cells, strips_placements, num_cols * num_rows)
+
+def count_placings(grid_values, strips, limit = None):
+    """Function that counts placings of the strips on the grid.
+       Input:
+           grid_values - tuple of strings, where each string represent one row of the grid;
+           each symbol of a string denote colour of the corresponding cell of the grid ('w' for white and 'b' for black).
+           strips - tuple of strings, where each string represent one strip;
+           each symbol of a string denote colour of the corresponding cell of a strip ('w' for white and 'b' for black).
+           limit - integer or None: if it is an integer, then counting stops, when limit placings are found;
+           for example, limit = 2 is enough to check that the grid has exactly one placing.
+       Output:
+           integer: number of placings, that differ not only by the order of the same strips (but not more than limit)."""
+    num_rows = len(grid_values)
+    num_cols = len(grid_values[0])
+    strips_placements = tuple(get_placement_index(strip, num_cols, num_rows)['placements'] for strip in strips)
+    black_cells = get_grid_bitboard(grid_values, num_cols, num_rows)
+    return count_dancing_links_placings(black_cells, strips_placements, num_cols * num_rows, limit)
+
+def create_solution_cache(max_size = 1024):
+    """Function that creates cache of placings for solve_grids, where grids, that are the same
+       up to rotation, reflection or inversion of colours (if strips allow it), share one entry.
+       Input:
+           max_size - integer: maximal number of entries in the cache; the least recently used entry is removed,
+           when the cache is full.
+       Output:
+           dictionary with keys 'entries' (ordered dictionary of placings by canonical grids),
+           'max_size', 'hits' and 'misses' (integers: number of found and not found grids)."""
+    return {'entries': collections.OrderedDict(), 'max_size': max_size, 'hits': 0, 'misses': 0}
+
+def solve_grid_with_cache(grid_values, strips, backend, precheck, cache):
+    """Function that finds placing of the strips on one grid with the help of the cache of placings.
+       Input:
+           grid_values - tuple of strings, where each string represent one row of the grid.
+           strips - tuple of strings, where each string represent one strip, in the order in which strips should be placed.
+           backend - string: 'bitboard', 'dfs' or 'dlx' (see solve_grids).
+           precheck - boolean: if True, then the grid is not searched, if it is rejected by get_rejection_reason.
+           cache - dictionary, created by create_solution_cache.
+       Output:
+           If search is successful, the function will return corresponding placing (see depth_first_search);
+           otherwise the function will return False."""
+    canonical_grid, transform, strips_order = get_canonical_grid(grid_values, strips)
+    key = (strips, canonical_grid)
+    entries = cache['entries']
+    if key in entries:
+        cache['hits'] += 1
+        entries.move_to_end(key)
+        canonical_placing = entries[key]
+    else:
+        cache['misses'] += 1
+        canonical_placing = solve_grid(canonical_grid, len(canonical_grid[0]), len(canonical_grid), strips, backend, precheck)
+        entries[key] = canonical_placing
+        if len(entries) > cache['max_size']:
+            entries.popitem(last = False)
+    if not canonical_placing:
+        return False
+    # return placing to the orientation of the given grid
+    placing = transform_placing(canonical_placing, get_inverse_transform(transform), len(canonical_grid[0]), len(canonical_grid))
+    return tuple(placing[strip_index] for strip_index in strips_order)
+
+def get_canonical_grid(grid_values, strips):
+    """Function that finds canonical form of the grid, that is the same for all grids, that are the same
+       up to rotation, reflection or inversion of colours; colours are inverted only if inverted strips are the same strips.
+       Input:
+           grid_values - tuple of strings, where each string represent one row of the grid.
+           strips - tuple of strings, where each string represent one strip, in the order in which strips should be placed.
+       Output:
+           tuple of three elements:
+           1) tuple of strings: canonical grid, that is the least of transformed grids;
+           2) transform of the grid to the canonical grid (see transform_cell);
+           3) tuple of integers: for every strip index of the strip in placing of the canonical grid,
+              that is placed in the same position on the given grid."""
+    num_rows = len(grid_values)
+    num_cols = len(grid_values[0])
+    grids_values = [(grid_values, tuple(range(len(strips))))]
+    inverted_strips_order = get_inverted_strips_order(strips)
+    if inverted_strips_order is not None:
+        inverted_grid_values = tuple(row_values.translate(str.maketrans('wb', 'bw')) for row_values in grid_values)
+        grids_values.append((inverted_grid_values, inverted_strips_order))
+    canonical = None
+    for (values, strips_order) in grids_values:
+        for transform in get_transforms():
+            transformed_grid = transform_grid(values, transform, num_cols, num_rows)
+            if canonical is None or transformed_grid < canonical[0]:
+                canonical = (transformed_grid, transform, strips_order)
+    return canonical
+
+def get_inverted_strips_order(strips):
+    """Function that finds for every strip its inverted strip, where white and black colours are changed.
+       Input:
+           strips - tuple of strings, where each string represent one strip.
+       Output:
+           tuple of integers, where each integer is an index of the strip, that is the inverted strip to the strip with the same index
+           (including reversed strips); if some strip has no inverted strip, then the function will return None."""
+    strips_order = []
+    for strip in strips:
+        inverted_strip = strip.translate(str.maketrans('wb', 'bw'))
+        for strip_index in range(len(strips)):
+            if strip_index not in strips_order and strips[strip_index] in (inverted_strip, inverted_strip[::-1]):
+                strips_order.append(strip_index)
+                break
+        else:
+            return None
+    return tuple(strips_order)
+
+def get_transforms():
+    """Function that returns all 8 transforms of a grid, that are combinations of rotations and reflections.
+       Output:
+           tuple of tuples of three booleans (see transform_cell)."""
+    return tuple((transpose, flip_cols, flip_rows) for transpose in (False, True)
+                 for flip_cols in (False, True) for flip_rows in (False, True))
+
+def get_inverse_transform(transform):
+    """Function that returns the inverse of the transform of a grid.
+       Input:
+           transform - tuple of three booleans (see transform_cell).
+       Output:
+           tuple of three booleans: inverse transform."""
+    transpose, flip_cols, flip_rows = transform
+    if transpose:
+        # flip of columns after transposition is the same as flip of rows before it
+        return (transpose, flip_rows, flip_cols)
+    return transform
+
+def transform_cell(cell, transform, num_cols, num_rows):
+    """Function that finds position of the cell after transform of the grid.
+       Input:
+           cell - tuple of two integers: cell of the grid.
+           transform - tuple of three booleans: the grid is transposed (columns become rows) if the first one is True,
+           and after that the columns are flipped if the second one is True, and the rows are flipped if the third one is True.
+           num_cols - integer: number of columns in the grid before transform.
+           num_rows - integer: number of rows in the grid before transform.
+       Output:
+           tuple of two integers: cell of the transformed grid."""
+    transpose, flip_cols, flip_rows = transform
+    col, row = cell
+    if transpose:
+        col, row = row, col
+        num_cols, num_rows = num_rows, num_cols
+    if flip_cols:
+        col = num_cols - 1 - col
+    if flip_rows:
+        row = num_rows - 1 - row
+    return (col, row)
+
+def transform_grid(grid_values, transform, num_cols, num_rows):
+    """Function that transforms the grid.
+       Input:
+           grid_values - tuple of strings, where each string represent one row of the grid.
+           transform - tuple of three booleans (see transform_cell).
+           num_cols - integer: number of columns in the grid.
+           num_rows - integer: number of rows in the grid.
+       Output:
+           tuple of strings: transformed grid."""
+    if transform[0]:
+        num_new_cols, num_new_rows = num_rows, num_cols
+    else:
+        num_new_cols, num_new_rows = num_cols, num_rows
+    new_grid = [[''] * num_new_cols for row in range(num_new_rows)]
+    for row in range(num_rows):
+        for col in range(num_cols):
+            new_col, new_row = transform_cell((col, row), transform, num_cols, num_rows)
+            new_grid[new_row][new_col] = grid_values[row][col]
+    return tuple(''.join(row_values) for row_values in new_grid)
+
+def transform_placing(placing, transform, num_cols, num_rows):
+    """Function that transforms the placing of the strips together with the grid.
+       Input:
+           placing - tuple of tuples, each of which represnt one placed strip (see depth_first_search).
+           transform - tuple of three booleans (see transform_cell).
+           num_cols - integer: number of columns in the grid.
+           num_rows - integer: number of rows in the grid.
+       Output:
+           tuple of tuples: placing of the strips on the transformed grid."""
+    new_placing = []
+    for ((col, row), orientation, strip_len) in placing:
+        if orientation == 'horizontal':
+            cells = [(col + i, row) for i in range(strip_len)]
+        else:
+            cells = [(col, row + i) for i in range(strip_len)]
+        new_cells = [transform_cell(cell, transform, num_cols, num_rows) for cell in cells]
+        # transposition changes orientation of the strip
+        if transform[0] == (orientation == 'horizontal'):
+            new_orientation = 'vertical'
+        else:
+            new_orientation = 'horizontal'
+        new_placing.append((min(new_cells), new_orientation, strip_len))
+    return tuple(new_placing)
+
+def iter_solved_grids(grids, strips, backend = 'bitboard', processes = None, keep_order = False, chunksize = 1, precheck = True):
+    """Function that solves grids in parallel in a pool of processes.
+       Strips and their placement indexes are sent to every process once, when the process is started.
+       Input:
+           grids - tuple of tuples of strings, where each tuple represent one grid (see solve_grids); all grids should have the same size.
+           strips - tuple of strings, where each string represent one strip (see solve_grids).
+           backend - string: 'bitboard', 'dfs' or 'dlx' (see solve_grids).
+           processes - integer: number of processes in the pool; if None, then the number of CPUs is used.
+           keep_order - boolean: if True, then results are generated in the order of grids,
+           otherwise they are generated as soon as they are ready.
+           chunksize - integer: number of grids, that are sent to a process together.
+           precheck - boolean: if True, then grids, that are rejected by get_rejection_reason, are not searched.
+       Output:
+           generator that will generate tuples of three elements:
+           1) integer: index of a grid in grids;
+           2) placing of the strips on that grid (see depth_first_search) or None, if the grid is not solved;
+           3) string: reason of rejection of the grid by get_rejection_reason, or None, if the grid is not rejected
+           (so the grid without placing and without the reason is searched without success)."""
+    if not grids:
+        return
+    num_rows = len(grids[0])
+    num_cols = len(grids[0][0])
+    # sorting strips according to length in decreasing order to make the problem easier
+    strips = tuple(sorted(strips,key = len,reverse = True))
+    if backend not in ('bitboard', 'dfs', 'dlx'):
+        raise ValueError("Unknown backend: " + str(backend))
+    # placement indexes are computed here once instead of in every process
+    indexes = {}
+    for strip in strips:
+        indexes[(strip, num_cols, num_rows)] = get_placement_index(strip, num_cols, num_rows)
+    with multiprocessing.Pool(processes, initializer = init_worker,
+                              initargs = (strips, num_cols, num_rows, backend, precheck, indexes)) as pool:
+        if keep_order:
+            results = pool.imap(solve_grid_in_worker, enumerate(grids), chunksize)
+        else:
+            results = pool.imap_unordered(solve_grid_in_worker, enumerate(grids), chunksize)
+        for result in results:
+            yield result
+
+def init_worker(strips, num_cols, num_rows, backend, precheck, indexes):
+    """Function that prepares a process of the pool in iter_solved_grids for solving grids.
+       Input:
+           strips - tuple of strings, where each string represent one strip, in the order in which strips should be placed.
+           num_cols - integer: number of columns in the grids.
+           num_rows - integer: number of rows in the grids.
+           backend - string: 'bitboard', 'dfs' or 'dlx' (see solve_grids).
+           precheck - boolean: if True, then grids, that are rejected by get_rejection_reason, are not searched.
+           indexes - dictionary of placement indexes of the strips (see placement_indexes)."""
+    placement_indexes.update(indexes)
+    worker_settings['strips'] = strips
+    worker_settings['num_cols'] = num_cols
+    worker_settings['num_rows'] = num_rows
+    worker_settings['backend'] = backend
+    worker_settings['precheck'] = precheck
+
+def solve_grid_in_worker(indexed_grid):
+    """Function that solves one grid in a process of the pool in iter_solved_grids.
+       Input:
+           indexed_grid - tuple of two elements: integer index of a grid and the grid as tuple of strings.
+       Output:
+           tuple of three elements: index of the grid, its placing or None, if the grid is not solved,
+           and the reason of rejection of the grid or None (see iter_solved_grids)."""
+    index, grid_values = indexed_grid
+    if worker_settings['precheck']:
+        reason = get_rejection_reason(grid_values, worker_settings['strips'])
+        if reason is not None:
+            return (index, None, reason)
+    placing = solve_grid(grid_values, worker_settings['num_cols'], worker_settings['num_rows'],
+                         worker_settings['strips'], worker_settings['backend'], False)
+    if not placing:
+        placing = None
+    return (index, placing, None)
+
 def depth_first_search(grid, num_cols, num_rows, strips, occupied_cells, placing):
     """Function that perform depth-first search to place the strips on the grid.
        Input:
@@ -58,7 +481,7 @@ def depth_first_search(grid, num_cols, num_rows, strips, occupied_cells, placing
     # current strip of search
     current_strip = strips[len(placing)]
     # position is used for search, representation is used for answer
-    for (position,representation) in get_strip_positions(current_strip, num_cols, num_rows):
+    for (position,representation,cells,black_cells) in get_placement_index(current_strip, num_cols, num_rows)['placements']:
         position_is_possible = True
         # check that position is possible
         for cell in position:
@@ -75,6 +498,348 @@ def depth_first_search(grid, num_cols, num_rows, strips, occupied_cells, placing
                 return final_placing
     return False
 
+def bitboard_depth_first_search(black_cells, strips_placements, occupied_cells, placing):
+    """Function that perform depth-first search to place the strips on the grid, represented as bitmasks.
+       Cell (col,row) of the grid corresponds to the bit with index row*num_cols + col.
+       Input:
+           black_cells - integer: bitmask of the black cells of the grid.
+           strips_placements - tuple of tuples, where each tuple contains possible placements of one strip
+           (see get_placement_index), in the same order as the strips should be placed.
+           occupied_cells - integer: bitmask of the cells that are under strip already.
+           placing - tuple of tuples, each of which represnt one placed strip and consist of 3 parts:
+           1) tuple of two integers that represent position of the left lower cell of a strip;
+           2) string: orientation of a strip ('horizontal' or 'vertical');
+           3) integer: length of a strip.
+       Output:
+           If search is successful, the function will return corresponding final placing;
+           otherwise the function will return False."""
+    if len(strips_placements) == len(placing):
+        # all strips are placed
+        return placing
+    for (position, representation, cells, black_cells_of_strip) in strips_placements[len(placing)]:
+        # position is possible, if its cells are free and colours of the strip are the same as colours of the grid
+        if cells & occupied_cells == 0 and cells & black_cells == black_cells_of_strip:
+            next_placing = placing + (representation,)
+            final_placing = bitboard_depth_first_search(black_cells, strips_placements, occupied_cells | cells, next_placing)
+            if final_placing:
+                return final_placing
+    return False
+
+def dancing_links_search(black_cells, strips_placements, num_cells):
+    """Function that places the strips on the grid with Algorithm X with Dancing Links.
+       Input:
+           black_cells - integer: bitmask of the black cells of the grid.
+           strips_placements - tuple of tuples, where each tuple contains possible placements of one strip (see get_placement_index).
+           num_cells - integer: number of cells in the grid.
+       Output:
+           If search is successful, the function will return corresponding placing (see depth_first_search),
+           where strips are in the same order as in strips_placements;
+           otherwise the function will return False."""
+    for placing in iter_dancing_links_placings(black_cells, strips_placements, num_cells):
+        return placing
+    return False
+
+def iter_dancing_links_placings(black_cells, strips_placements, num_cells):
+    """Function that generates all placings of the strips on the grid with Algorithm X with Dancing Links.
+       Placings, that differ only by the order of the same strips, are generated once.
+       Input:
+           black_cells - integer: bitmask of the black cells of the grid.
+           strips_placements - tuple of tuples, where each tuple contains possible placements of one strip (see get_placement_index).
+           num_cells - integer: number of cells in the grid.
+       Output:
+           generator that will generate placings (see depth_first_search), where strips are in the same order as in strips_placements."""
+    exact_cover = get_exact_cover(black_cells, strips_placements, num_cells)
+    if exact_cover is None:
+        return
+    num_items, multiplicities, num_free_cells, options = exact_cover
+    # indexes of the strips of every kind in increasing order
+    strips_of_kinds = [[] for kind in multiplicities]
+    for (strip_index, kind) in enumerate(get_strips_kinds(strips_placements)):
+        strips_of_kinds[kind].append(strip_index)
+    placing = [None] * len(strips_placements)
+    for chosen_options in iter_exact_covers(num_items, multiplicities, num_free_cells, options):
+        # the same strips are placed in the order of their placements
+        num_placed = [0] * len(multiplicities)
+        for (kind, placement_cells, representation) in sorted(options[option_index][1] for option_index in chosen_options):
+            placing[strips_of_kinds[kind][num_placed[kind]]] = representation
+            num_placed[kind] += 1
+        yield tuple(placing)
+
+def count_dancing_links_placings(black_cells, strips_placements, num_cells, limit = None):
+    """Function that counts placings of the strips on the grid with Algorithm X with Dancing Links without creating them.
+       Input:
+           black_cells - integer: bitmask of the black cells of the grid.
+           strips_placements - tuple of tuples, where each tuple contains possible placements of one strip (see get_placement_index).
+           num_cells - integer: number of cells in the grid.
+           limit - integer or None: if it is an integer, then counting stops, when limit placings are found.
+       Output:
+           integer: number of placings, that differ not only by the order of the same strips (but not more than limit)."""
+    exact_cover = get_exact_cover(black_cells, strips_placements, num_cells)
+    if exact_cover is None:
+        return 0
+    num_items, multiplicities, num_free_cells, options = exact_cover
+    num_covers = 0
+    for chosen_options in iter_exact_covers(num_items, multiplicities, num_free_cells, options):
+        num_covers += 1
+        if num_covers == limit:
+            break
+    return num_covers
+
+def get_strips_kinds(strips_placements):
+    """Function that finds the same strips, including strips, that are reversed to each other.
+       Input:
+           strips_placements - tuple of tuples, where each tuple contains possible placements of one strip (see get_placement_index).
+       Output:
+           list of integers, where the same strips have the same integer."""
+    kinds = {}
+    strips_kinds = []
+    for placements in strips_placements:
+        cells_and_colours = frozenset((cells, black_cells) for (position, representation, cells, black_cells) in placements)
+        strips_kinds.append(kinds.setdefault(cells_and_colours, len(kinds)))
+    return strips_kinds
+
+def get_exact_cover(black_cells, strips_placements, num_cells):
+    """Function that represents placing of the strips on the grid as an exact cover problem:
+       every kind of the same strips is an item, that should be covered once for every strip of that kind,
+       and every cell is an item, that should be covered once, except cells that remain free,
+       when strips have less cells than the grid.
+       Input:
+           black_cells - integer: bitmask of the black cells of the grid.
+           strips_placements - tuple of tuples, where each tuple contains possible placements of one strip (see get_placement_index).
+           num_cells - integer: number of cells in the grid.
+       Output:
+           if strips can't be placed on the grid because of their number of cells, then the function will return None;
+           otherwise it will return tuple of four elements (see iter_exact_covers):
+           1) integer: number of items, where kinds of strips (see get_strips_kinds) are items from 0 and cells are following items;
+           2) list of integers: number of strips of every kind;
+           3) integer: number of cells, that remain free;
+           4) list of options, where each option is a tuple of the list of items and tuple of
+              kind of the strip, bitmasks of the cells and the black cells of the placement and representation of the placement."""
+    # number of cells, that remain free after all strips are placed
+    num_free_cells = num_cells
+    for placements in strips_placements:
+        if not placements:
+            # strip can't be placed on the grid
+            return None
+        num_free_cells -= len(placements[0][0])
+    if num_free_cells < 0:
+        return None
+    multiplicities = []
+    options = []
+    for (strip_index, kind) in enumerate(get_strips_kinds(strips_placements)):
+        if kind < len(multiplicities):
+            # placements of the same strips are options of the same item
+            multiplicities[kind] += 1
+            continue
+        multiplicities.append(1)
+        for (position, representation, cells, black_cells_of_strip) in strips_placements[strip_index]:
+            # only placements with the same colours as the grid are options
+            if cells & black_cells == black_cells_of_strip:
+                options.append([kind, (cells, black_cells_of_strip), representation])
+    num_kinds = len(multiplicities)
+    for option_index in range(len(options)):
+        kind, placement_cells, representation = options[option_index]
+        option_items = [kind]
+        remaining_cells = placement_cells[0]
+        while remaining_cells:
+            lowest_cell = remaining_cells & -remaining_cells
+            option_items.append(num_kinds + lowest_cell.bit_length() - 1)
+            remaining_cells ^= lowest_cell
+        options[option_index] = (option_items, (kind, placement_cells, representation))
+    return (num_kinds + num_cells, multiplicities, num_free_cells, options)
+
+def iter_exact_covers(num_items, multiplicities, num_free_items, options):
+    """Function that generates all solutions of the exact cover problem with Algorithm X with Dancing Links,
+       where some items should be covered several times.
+       Every set of options is generated once: an item, that should be covered more than once,
+       is never chosen for branching, so options, that cover it, are only chosen in different orders in different branches.
+       Input:
+           num_items - integer: number of items, that are numbered from 0 to num_items - 1.
+           multiplicities - list of integers: item with index i less than len(multiplicities) should be covered exactly
+           multiplicities[i] times, and items from len(multiplicities) should be covered at most once.
+           num_free_items - integer: number of items from len(multiplicities), that should remain uncovered.
+           options - list of tuples, where first element of each tuple is a list of items, covered by the option;
+           each option covers at most one item with index less than len(multiplicities).
+       Output:
+           generator that will generate lists of indexes of chosen options, that cover items;
+           the same list is changed after it is generated, so it should be copied to be kept."""
+    first_free_item = len(multiplicities)
+    # number of times every item should still be covered
+    remaining = list(multiplicities) + [1] * (num_items - first_free_item)
+    # nodes from 0 to num_items - 1 are headers of the items, node num_items is the root,
+    # and other nodes correspond to the items of the options
+    root = num_items
+    left = [i - 1 for i in range(num_items + 1)]
+    right = [i + 1 for i in range(num_items + 1)]
+    left[0] = root
+    right[root] = 0
+    up = list(range(num_items + 1))
+    down = list(range(num_items + 1))
+    item_of_node = list(range(num_items + 1))
+    option_of_node = [-1] * (num_items + 1)
+    counts = [0] * num_items
+    for option_index in range(len(options)):
+        first_node = len(left)
+        for item in options[option_index][0]:
+            node = len(left)
+            # link the node in the row of the option
+            left.append(node - 1)
+            right.append(first_node)
+            if node != first_node:
+                right[node - 1] = node
+            # link the node at the bottom of the column of the item
+            up.append(up[item])
+            down.append(item)
+            down[up[item]] = node
+            up[item] = node
+            item_of_node.append(item)
+            option_of_node.append(option_index)
+            counts[item] += 1
+        left[first_node] = len(left) - 1
+    def cover(item):
+        right[left[item]] = right[item]
+        left[right[item]] = left[item]
+        i = down[item]
+        while i != item:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                counts[item_of_node[j]] -= 1
+                j = right[j]
+            i = down[i]
+    def uncover(item):
+        i = up[item]
+        while i != item:
+            j = left[i]
+            while j != i:
+                counts[item_of_node[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[item]] = item
+        left[right[item]] = item
+    def cover_once(item):
+        # item is covered completely, when it is covered for the last time
+        remaining[item] -= 1
+        if remaining[item] == 0:
+            cover(item)
+    def uncover_once(item):
+        if remaining[item] == 0:
+            uncover(item)
+        remaining[item] += 1
+    chosen_options = []
+    def search(num_free_items):
+        if right[root] == root:
+            yield chosen_options
+            return
+        # choose the item with the fewest remaining options, where leaving the item uncovered is also an option;
+        # items, that should be covered several times, are covered by options chosen for other items
+        best_item = -1
+        best_count = None
+        item = right[root]
+        while item != root:
+            count = counts[item]
+            if item < first_free_item and count < remaining[item]:
+                return
+            if remaining[item] == 1:
+                if item >= first_free_item and num_free_items > 0:
+                    count += 1
+                if best_count is None or count < best_count:
+                    best_item, best_count = item, count
+                    if count == 0:
+                        return
+            item = right[item]
+        if best_item < 0:
+            return
+        cover(best_item)
+        i = down[best_item]
+        while i != best_item:
+            chosen_options.append(option_of_node[i])
+            j = right[i]
+            while j != i:
+                cover_once(item_of_node[j])
+                j = right[j]
+            yield from search(num_free_items)
+            j = left[i]
+            while j != i:
+                uncover_once(item_of_node[j])
+                j = left[j]
+            chosen_options.pop()
+            i = down[i]
+        if best_item >= first_free_item and num_free_items > 0:
+            # leave the item uncovered
+            yield from search(num_free_items - 1)
+        uncover(best_item)
+    yield from search(num_free_items)
+
+def get_grid_bitboard(grid_values, num_cols, num_rows):
+    """Function that represent black cells of a grid as a bitmask.
+       Input:
+           grid_values - tuple of strings, where each string represent one row of the grid;
+           each symbol of a string denote colour of the corresponding cell of the grid ('w' for white and 'b' for black).
+           num_cols - integer: number of columns in the grid.
+           num_rows - integer: number of rows in the grid.
+       Output:
+           integer: bitmask, where bit with index row*num_cols + col is set, if the cell (col,row) is black."""
+    black_cells = 0
+    for row in range(num_rows):
+        for col in range(num_cols):
+            if grid_values[row][col] == 'b':
+                black_cells |= 1 << (row*num_cols + col)
+    return black_cells
+
+def get_placement_index(strip, num_cols, num_rows):
+    """Function that returns placement index of the given strip for the grid with the given number of columns and rows.
+       Index is computed once for every strip and dimensions of the grid and then is taken from placement_indexes.
+       Input:
+           strip - string that represent one strip, where each symbol denote colour of the corresponding cell ('w' for white and 'b' for black).
+           num_cols - integer: number of columns in the grid.
+           num_rows - integer: number of rows in the grid.
+       Output:
+           dictionary with two keys:
+           'placements' - tuple of tuples of four elements, in the same order as positions are generated by get_strip_positions:
+               1) dictionary: position of the strip (see get_strip_positions);
+               2) representation of the position of the strip (see get_strip_positions);
+               3) integer: bitmask of the cells under the strip, where bit with index row*num_cols + col correspond to the cell (col,row);
+               4) integer: bitmask of the cells under the black cells of the strip, that is colour signature of the placement;
+           'placements_by_cell' - dictionary, where keys are tuples of two integers that represent cells of the grid,
+               and values are tuples of indexes of the placements in 'placements', that cover that cell.
+           The index is shared, so it should not be changed."""
+    key = (strip, num_cols, num_rows)
+    if key in placement_indexes:
+        return placement_indexes[key]
+    placements = []
+    placements_by_cell = {}
+    for (position,representation) in get_strip_positions(strip, num_cols, num_rows):
+        cells = 0
+        black_cells = 0
+        for (col,row) in position:
+            bit = 1 << (row*num_cols + col)
+            cells |= bit
+            if position[(col,row)] == 'b':
+                black_cells |= bit
+            placements_by_cell.setdefault((col,row), []).append(len(placements))
+        placements.append((position, representation, cells, black_cells))
+    placement_index = {'placements': tuple(placements),
+                       'placements_by_cell': {cell: tuple(indexes) for (cell, indexes) in placements_by_cell.items()}}
+    placement_indexes[key] = placement_index
+    return placement_index
+
+def get_placements_covering_cell(strip, cell, num_cols, num_rows):
+    """Function that returns placements of the given strip that cover the given cell.
+       Input:
+           strip - string that represent one strip, where each symbol denote colour of the corresponding cell ('w' for white and 'b' for black).
+           cell - tuple of two integers: cell of the grid.
+           num_cols - integer: number of columns in the grid.
+           num_rows - integer: number of rows in the grid.
+       Output:
+           tuple of placements of the strip (see get_placement_index), that cover the cell."""
+    placement_index = get_placement_index(strip, num_cols, num_rows)
+    placements = placement_index['placements']
+    return tuple(placements[i] for i in placement_index['placements_by_cell'].get(cell, ()))
+
 def get_strip_positions(strip, num_cols, num_rows):
     """Function that generate possible positions for the given strip according to the number of columns and rows in the grid.
        Input:
@@ -123,35 +888,35 @@ def get_placing_outline(placing, num_cols, num_rows):
            num_rows - integer: number of rows in the grid.
        Output:
            list of strings, where each string, consisted of bars, underscores and spaces, represent one horizontal level of the outline."""
-    cells_without_left_border = ()
-    cells_without_lower_border = ()
+    cells_without_left_border = set()
+    cells_without_lower_border = set()
     for strip in placing:
         col, row = strip[0][0], strip[0][1]
         orientation = strip[1]
         strip_len = strip[2]
         if orientation == 'horizontal':
             for i in range(1, strip_len):
-                cells_without_left_border += ((col + i, row),)
+                cells_without_left_border.add((col + i, row))
         elif orientation == 'vertical':
             for i in range(1, strip_len):
-                cells_without_lower_border += ((col, row + i),)
+                cells_without_lower_border.add((col, row + i))
     outline = []
     # decremental loop for rows with one additional row for the upper border of the grid
     for row in range(num_rows,-1,-1):
-        level = ''
+        level = []
         # loop for cols with one additional col for the right border of the grid
         for col in range(num_cols+1):
             cell = (col,row)
             if row == num_rows or cell in cells_without_left_border:
-                level += ' '
+                level.append(' ')
             else:
-                level += '|'
+                level.append('|')
             if col < num_cols:
                 if cell in cells_without_lower_border:
-                    level += ' '
+                    level.append(' ')
                 else:
-                    level += '_'
-        outline.append(level)
+                    level.append('_')
+        outline.append(''.join(level))
     return outline
 
 def get_output(outlines, outlines_per_row):
@@ -163,20 +928,53 @@ def get_output(outlines, outlines_per_row):
        Output:
            string, where outlines of the placings arranged in outlines_per_row outlines in one row with one space between them,
            and there is a new line after each horizontal level of one row and between different rows."""
-    output = ''
-    # determine starting index for every row
-    for first_index in range(0, len(outlines), outlines_per_row):
-        last_index = min(first_index + outlines_per_row, len(outlines))
-        # add first outline to the row
-        one_row = outlines[first_index]
-        # add other outlines to the row
-        for i in range(first_index + 1, last_index):
-            current_outline = outlines[i]
-            for level_index in range(len(current_outline)):
-                one_row[level_index] += ' ' + current_outline[level_index]
-        for level in one_row:
-            output += level + '\n'
-    return output
+    output = io.StringIO()
+    write_outlines(outlines, outlines_per_row, output)
+    return output.getvalue()
+
+def write_outlines(outlines, outlines_per_row, stream):
+    """Function that writes outlines to the stream with outlines_per_row outlines in one row (see get_output).
+       Every row is written as soon as its outlines are received, and the outlines are not changed.
+       Input:
+           outlines - iterable (for example, generator) of lists of strings, where each list represent an outline of one placing
+           and each string, consisted of bars, underscores and spaces, represent one horizontal level of the outline.
+           outlines_per_row - integer: amount of outlines in one row of output.
+           stream - text stream (for example, opened file or sys.stdout), where the outlines are written."""
+    one_row = []
+    for outline in outlines:
+        one_row.append(outline)
+        if len(one_row) == outlines_per_row:
+            write_outlines_row(one_row, stream)
+            one_row = []
+    if one_row:
+        write_outlines_row(one_row, stream)
+
+def write_outlines_row(one_row, stream):
+    """Function that writes one row of outlines to the stream with one space between them.
+       Input:
+           one_row - list of outlines (see write_outlines).
+           stream - text stream, where the row is written."""
+    for level_index in range(len(one_row[0])):
+        stream.write(' '.join([outline[level_index] for outline in one_row]))
+        stream.write('\n')
+
+def write_placings(placings, num_cols, num_rows, outlines_per_row, stream):
+    """Function that writes outlines of the placings to the stream with outlines_per_row outlines in one row.
+       Input:
+           placings - iterable (for example, generator) of placings (see depth_first_search).
+           num_cols - integer: number of columns in the grids.
+           num_rows - integer: number of rows in the grids.
+           outlines_per_row - integer: amount of outlines in one row of output.
+           stream - text stream, where the outlines are written."""
+    outlines = (get_placing_outline(placing, num_cols, num_rows) for placing in placings)
+    write_outlines(outlines, outlines_per_row, stream)
+
+# placement indexes of the strips, that are already computed,
+# where keys are tuples of strip, number of columns and number of rows (see get_placement_index)
+placement_indexes = {}
+
+# settings of a process, that solves grids in iter_solved_grids (see init_worker)
+worker_settings = {}
 
 # strips for the puzzle            
 strips = ('ww','wb','bb','www','wwb','wbw','wbb','bwb','bbb')
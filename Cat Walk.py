@@ -1,4 +1,12 @@
+import array
+import mmap
+import multiprocessing
 import string
+import struct
+import sys
+
+# directions of movements from a cell in the order of the slots of the cell in a compiled maze
+directions = ('up', 'down', 'right', 'left')
 
 def generate_maze(num_cols, num_rows, imaginary_cells,
                   cells_on_the_left_edge, cells_on_the_right_edge, cells_with_right_border_inside_maze,
@@ -22,13 +30,14 @@ def generate_maze(num_cols, num_rows, imaginary_cells,
            dictionary represented the maze: it's keys are tuples of two integers, represented cells;
            it's values are dictionaries, where keys are strings of available movements ('up', 'down', 'left' or 'right')
            and values are colours of the gates associated with that movements (strings represented colours or None)."""
-    cells_with_left_border = cells_on_the_left_edge
-    cells_with_right_border = cells_on_the_right_edge
+    imaginary_cells = set(imaginary_cells)
+    cells_with_left_border = set(cells_on_the_left_edge)
+    cells_with_right_border = set(cells_on_the_right_edge)
     for cell in cells_with_right_border_inside_maze:
-        # extend the tuple of cells with right border
-        cells_with_right_border += (cell,)
-        # extend the tuple of cells with left border
-        cells_with_left_border += ((cell[0]+1,cell[1]),)        
+        # extend the set of cells with right border
+        cells_with_right_border.add(cell)
+        # extend the set of cells with left border
+        cells_with_left_border.add((cell[0]+1,cell[1]))
     cells_with_right_gate = {}
     cells_with_left_gate = {}
     for colour in cells_with_right_gate_by_colours:
@@ -66,6 +75,788 @@ def generate_maze(num_cols, num_rows, imaginary_cells,
                 maze[cell] = cell_gates
     return maze
 
+def compile_maze(maze):
+    """Function that converts representation of the maze as a dictionary (see generate_maze) to the compiled maze,
+       where cells are numbered and movements are stored in flat arrays.
+       Cell (col,row) has number row*num_cols + col, and it has four slots with numbers from 4*number to 4*number + 3,
+       that correspond to the movements 'up', 'down', 'right' and 'left'.
+       Input:
+           maze - dictionary represented a maze (see generate_maze).
+       Output:
+           dictionary represented the compiled maze with keys:
+           'num_cols' and 'num_rows' - integers: number of columns and rows in the maze;
+           'colours' - tuple of strings: colours of the gates, where index of a colour is its number;
+           'neighbours' - array of integers: for every slot number of the near cell or -1, if there is no such movement;
+           'gate_colours' - array of integers: for every slot number of the colour of the gate or -1, if the gate has no colour;
+           'letters' - array of integers: for every slot code of the letter, that is added to the phrase,
+               when the movement passes through the coloured gate, or 0, if there is no letter."""
+    num_cols = max(cell[0] for cell in maze) + 1
+    num_rows = max(cell[1] for cell in maze) + 1
+    colours = []
+    for cell in maze:
+        for gate_colour in maze[cell].values():
+            if gate_colour is not None and gate_colour not in colours:
+                colours.append(gate_colour)
+    num_slots = 4 * num_cols * num_rows
+    neighbours = array.array('i', [-1]) * num_slots
+    gate_colours = array.array('b', [-1]) * num_slots
+    letters = array.array('B', [0]) * num_slots
+    for (col,row) in maze:
+        cell_number = row*num_cols + col
+        for slot_index in range(4):
+            direction = directions[slot_index]
+            if direction not in maze[(col,row)]:
+                continue
+            if direction == 'up':
+                near_cell = (col, row+1)
+            elif direction == 'down':
+                near_cell = (col,row-1)
+            elif direction == 'left':
+                near_cell = (col-1,row)
+            elif direction == 'right':
+                near_cell = (col+1,row)
+            if near_cell not in maze:
+                continue
+            slot = 4*cell_number + slot_index
+            neighbours[slot] = near_cell[1]*num_cols + near_cell[0]
+            gate_colour = maze[(col,row)][direction]
+            if gate_colour is not None:
+                gate_colours[slot] = colours.index(gate_colour)
+            # letters are defined only for the columns from 'A' to 'Z'
+            if (direction == 'up' or direction == 'down') and col < len(string.ascii_uppercase):
+                letters[slot] = ord(string.ascii_uppercase[col])
+    return {'num_cols': num_cols, 'num_rows': num_rows, 'colours': tuple(colours),
+            'neighbours': neighbours, 'gate_colours': gate_colours, 'letters': letters}
+
+def save_maze(compiled_maze, file_path):
+    """Function that saves the compiled maze to the binary file, that can be loaded with load_maze.
+       File consists of the header and three sections with fixed-width records for every cell:
+       header - 8 bytes of signature, then number of columns, number of rows, number of colours
+           and length of the names of colours as 4-byte little-endian integers, then names of colours,
+           separated by new line symbols and padded with zero bytes to the multiple of 4 bytes;
+       neighbours - for every cell four 4-byte little-endian integers (see compile_maze);
+       gate colours - for every cell four signed bytes (see compile_maze);
+       letters - for every cell four unsigned bytes (see compile_maze).
+       Input:
+           compiled_maze - dictionary represented the compiled maze (see compile_maze);
+           file_path - string: path of the file."""
+    colour_names = '\n'.join(compiled_maze['colours']).encode('utf-8')
+    neighbours = array.array('i', compiled_maze['neighbours'])
+    if sys.byteorder == 'big':
+        neighbours.byteswap()
+    with open(file_path, 'wb') as maze_file:
+        maze_file.write(maze_file_signature)
+        maze_file.write(struct.pack('<4I', compiled_maze['num_cols'], compiled_maze['num_rows'],
+                                    len(compiled_maze['colours']), len(colour_names)))
+        maze_file.write(colour_names + bytes(-len(colour_names) % 4))
+        maze_file.write(neighbours.tobytes())
+        maze_file.write(array.array('b', compiled_maze['gate_colours']).tobytes())
+        maze_file.write(array.array('B', compiled_maze['letters']).tobytes())
+
+def load_maze(file_path):
+    """Function that loads the compiled maze from the binary file, created by save_maze.
+       The file is mapped to memory, and arrays of the maze read values directly from it.
+       Input:
+           file_path - string: path of the file.
+       Output:
+           dictionary represented the compiled maze (see compile_maze) with additional keys
+           'file_path' (path of the file) and 'buffer' (memory-mapped file)."""
+    with open(file_path, 'rb') as maze_file:
+        buffer = mmap.mmap(maze_file.fileno(), 0, access = mmap.ACCESS_READ)
+    if buffer[:len(maze_file_signature)] != maze_file_signature:
+        raise ValueError("File " + file_path + " is not a file of a maze")
+    offset = len(maze_file_signature)
+    num_cols, num_rows, num_colours, colour_names_length = struct.unpack_from('<4I', buffer, offset)
+    offset += 16
+    colour_names = bytes(buffer[offset:offset + colour_names_length]).decode('utf-8')
+    colours = tuple(colour_names.split('\n')) if num_colours else ()
+    offset += colour_names_length + (-colour_names_length % 4)
+    num_slots = 4 * num_cols * num_rows
+    view = memoryview(buffer)
+    if sys.byteorder == 'little':
+        neighbours = view[offset:offset + 4*num_slots].cast('i')
+    else:
+        neighbours = array.array('i', view[offset:offset + 4*num_slots])
+        neighbours.byteswap()
+    offset += 4*num_slots
+    gate_colours = view[offset:offset + num_slots].cast('b')
+    offset += num_slots
+    letters = view[offset:offset + num_slots].cast('B')
+    return {'num_cols': num_cols, 'num_rows': num_rows, 'colours': colours,
+            'neighbours': neighbours, 'gate_colours': gate_colours, 'letters': letters,
+            'file_path': file_path, 'buffer': buffer}
+
+def convert_maze_definitions(file_path):
+    """Function that converts the maze of the puzzle, defined in this module, to the binary file (see save_maze).
+       Input:
+           file_path - string: path of the file."""
+    maze = generate_maze(num_cols, num_rows, imaginary_cells,
+                         cells_on_the_left_edge, cells_on_the_right_edge, cells_with_right_border_inside_maze,
+                         cells_with_right_gate_by_colours, cells_with_upper_gate_by_colours)
+    save_maze(compile_maze(maze), file_path)
+
+def get_portable_maze(compiled_maze):
+    """Function that prepares the compiled maze for sending to other processes:
+       the maze, loaded from a file, is replaced with the path of the file, so that processes map the file themselves.
+       Input:
+           compiled_maze - dictionary represented the compiled maze (see compile_maze and load_maze).
+       Output:
+           string: path of the file of the maze, or the compiled maze itself."""
+    if 'file_path' in compiled_maze:
+        return compiled_maze['file_path']
+    return compiled_maze
+
+def get_maze_from_portable(portable_maze):
+    """Function that restores the compiled maze, prepared by get_portable_maze.
+       Input:
+           portable_maze - string: path of the file of the maze, or the compiled maze.
+       Output:
+           dictionary represented the compiled maze."""
+    if isinstance(portable_maze, str):
+        return load_maze(portable_maze)
+    return portable_maze
+
+def compile_palette(compiled_maze, palette, first_colour):
+    """Function that converts colours of the palette to the numbers of colours of the compiled maze.
+       Input:
+           compiled_maze - dictionary represented the compiled maze (see compile_maze);
+           palette - dictionary, consisted of strings, where keys are colours for the path and values are corresponding next colours;
+           first_colour - string, colour of the first coloured gate from the palette.
+       Output:
+           tuple of two elements:
+           1) list of integers: for every number of colour number of the next colour or -1, if the colour is not in the palette;
+              colours of the palette, that are not in the maze, get numbers after the colours of the maze;
+           2) integer: number of the first colour."""
+    colours = get_palette_colours(compiled_maze, palette, (first_colour,))
+    return (get_next_colours(colours, palette), colours.index(first_colour))
+
+def get_palette_colours(compiled_maze, palette, other_colours = ()):
+    """Function that numbers colours of the compiled maze and of the palette.
+       Input:
+           compiled_maze - dictionary represented the compiled maze (see compile_maze);
+           palette - dictionary, consisted of strings, where keys are colours for the path and values are corresponding next colours;
+           other_colours - tuple of strings: other colours, that should be numbered.
+       Output:
+           list of strings: colours, where index of a colour is its number; colours of the maze have the same numbers,
+           as in the compiled maze, and colours of the palette, that are not in the maze, get numbers after them."""
+    colours = list(compiled_maze['colours'])
+    for colour in tuple(palette) + tuple(palette.values()) + tuple(other_colours):
+        if colour not in colours:
+            colours.append(colour)
+    return colours
+
+def get_next_colours(colours, palette):
+    """Function that converts the palette to numbers of colours.
+       Input:
+           colours - list of strings: numbered colours (see get_palette_colours);
+           palette - dictionary, consisted of strings, where keys are colours for the path and values are corresponding next colours.
+       Output:
+           list of integers: for every number of colour number of the next colour or -1, if the colour is not in the palette."""
+    next_colours = [-1] * len(colours)
+    for colour in palette:
+        next_colours[colours.index(colour)] = colours.index(palette[colour])
+    return next_colours
+
+def reachable_states(maze, goal_cells, palette):
+    """Function that finds states of the search, from which the goal cells can be reached according to the colours in palette.
+       Reachability doesn't take into account that the path is acyclic, so search can skip all other states.
+       Input:
+           maze - dictionary represented a maze (see generate_maze);
+           goal_cells - list or tuple of tuples of two integers, collection of the goal cells;
+           palette - dictionary, consisted of strings, where keys are colours for the path and values are corresponding next colours.
+       Output:
+           set of tuples of two elements: tuple of two integers, that is a cell, and string, that is colour of the next coloured gate."""
+    compiled_maze = compile_maze(maze)
+    num_cols = compiled_maze['num_cols']
+    colours = get_palette_colours(compiled_maze, palette)
+    next_colours = get_next_colours(colours, palette)
+    # colours of the next coloured gate are colours of the palette
+    palette_colours = set(palette) | set(palette.values())
+    goals = get_goals(compiled_maze, goal_cells)
+    reachable = get_reachable_table(compiled_maze, goals, next_colours)
+    num_colours = len(next_colours)
+    states = set()
+    for state in range(len(reachable)):
+        if reachable[state]:
+            cell_number, colour = divmod(state, num_colours)
+            if colours[colour] in palette_colours:
+                states.add(((cell_number % num_cols, cell_number // num_cols), colours[colour]))
+    return states
+
+def get_goals(compiled_maze, goal_cells):
+    """Function that marks the goal cells of the compiled maze.
+       Input:
+           compiled_maze - dictionary represented the compiled maze (see compile_maze);
+           goal_cells - list or tuple of tuples of two integers, collection of the goal cells.
+       Output:
+           bytearray: for every number of cell 1, if it is a goal cell, and 0 otherwise."""
+    num_cols = compiled_maze['num_cols']
+    goals = bytearray(num_cols * compiled_maze['num_rows'])
+    for (col,row) in goal_cells:
+        goals[row*num_cols + col] = 1
+    return goals
+
+def get_reachable_table(compiled_maze, goals, next_colours, incoming_slots = None):
+    """Function that finds states of the compiled maze, from which the goal cells can be reached,
+       where state is a cell with colour of the next coloured gate.
+       Input:
+           compiled_maze - dictionary represented the compiled maze (see compile_maze);
+           goals - bytearray: for every number of cell 1, if it is a goal cell, and 0 otherwise;
+           next_colours - list of integers: numbers of the next colours (see compile_palette);
+           incoming_slots - list of lists of slots, that lead to every cell (see get_incoming_slots), or None.
+       Output:
+           bytearray: for state with number cell*len(next_colours) + colour 1, if the goal cells can be reached from that state,
+           and 0 otherwise."""
+    distances = get_goal_distances(compiled_maze, goals, next_colours, incoming_slots)
+    return bytearray(distance >= 0 for distance in distances)
+
+def get_goal_distances(compiled_maze, goals, next_colours, incoming_slots = None):
+    """Function that performs breadth-first search from the goal cells in the reversed graph of states of the compiled maze,
+       where state is a cell with colour of the next coloured gate.
+       Input:
+           compiled_maze - dictionary represented the compiled maze (see compile_maze);
+           goals - bytearray: for every number of cell 1, if it is a goal cell, and 0 otherwise;
+           next_colours - list of integers: numbers of the next colours (see compile_palette);
+           incoming_slots - list of lists of slots, that lead to every cell (see get_incoming_slots), or None.
+       Output:
+           array of integers: for state with number cell*len(next_colours) + colour the least number of movements
+           from that state to the goal cells, or -1, if the goal cells can't be reached from that state."""
+    gate_colours = compiled_maze['gate_colours']
+    num_cells = len(goals)
+    num_colours = len(next_colours)
+    if incoming_slots is None:
+        incoming_slots = get_incoming_slots(compiled_maze)
+    # colours, that are changed to the given colour after passing through the gate of the same colour
+    previous_colours = [[] for colour in range(num_colours)]
+    for colour in range(num_colours):
+        if next_colours[colour] >= 0:
+            previous_colours[next_colours[colour]].append(colour)
+    distances = array.array('i', [-1]) * (num_cells * num_colours)
+    queue = []
+    for cell in range(num_cells):
+        if goals[cell]:
+            for colour in range(num_colours):
+                distances[cell*num_colours + colour] = 0
+                queue.append((cell, colour))
+    for (cell, colour) in queue:
+        distance = distances[cell*num_colours + colour] + 1
+        for slot in incoming_slots[cell]:
+            previous_cell = slot // 4
+            gate_colour = gate_colours[slot]
+            if gate_colour < 0:
+                previous_colour = colour
+            elif gate_colour in previous_colours[colour]:
+                previous_colour = gate_colour
+            else:
+                continue
+            state = previous_cell*num_colours + previous_colour
+            if distances[state] < 0:
+                distances[state] = distance
+                queue.append((previous_cell, previous_colour))
+    return distances
+
+def get_incoming_slots(compiled_maze):
+    """Function that finds movements, that lead to every cell of the compiled maze.
+       Input:
+           compiled_maze - dictionary represented the compiled maze (see compile_maze).
+       Output:
+           list of lists of integers: for every number of cell slots of the movements, that lead to that cell."""
+    neighbours = compiled_maze['neighbours']
+    incoming_slots = [[] for cell in range(compiled_maze['num_cols'] * compiled_maze['num_rows'])]
+    for slot in range(len(neighbours)):
+        if neighbours[slot] >= 0:
+            incoming_slots[neighbours[slot]].append(slot)
+    return incoming_slots
+
+def create_query_engine(maze):
+    """Function that creates engine for answering many queries of search in one maze,
+       where the maze is compiled once and precomputed tables are kept for the following queries.
+       Input:
+           maze - dictionary represented a maze (see generate_maze) or the compiled maze (see compile_maze).
+       Output:
+           dictionary with keys 'compiled_maze', 'incoming_slots' (see get_incoming_slots)
+           and 'tables' (dictionary of tables for goal cells and palettes, see get_query_tables)."""
+    if 'neighbours' not in maze:
+        maze = compile_maze(maze)
+    return {'compiled_maze': maze, 'incoming_slots': get_incoming_slots(maze), 'tables': {}}
+
+def get_query_tables(engine, goal_cells, palette, first_colour):
+    """Function that returns tables for search in the maze of the engine with the given goal cells and palette,
+       that are computed once and then are taken from the engine.
+       Input:
+           engine - dictionary, created by create_query_engine;
+           goal_cells - list or tuple of tuples of two integers, collection of the goal cells;
+           palette - dictionary, consisted of strings, where keys are colours for the path and values are corresponding next colours;
+           first_colour - string, colour of the first coloured gate from the palette.
+       Output:
+           dictionary with keys 'goals' (see get_goals), 'next_colours' and 'first_colour' (see compile_palette),
+           'distances' (see get_goal_distances) and 'reachable' (see get_reachable_table)."""
+    key = (tuple(sorted(goal_cells)), tuple(sorted(palette.items())), first_colour)
+    if key not in engine['tables']:
+        compiled_maze = engine['compiled_maze']
+        goals = get_goals(compiled_maze, goal_cells)
+        next_colours, first_colour_number = compile_palette(compiled_maze, palette, first_colour)
+        distances = get_goal_distances(compiled_maze, goals, next_colours, engine['incoming_slots'])
+        engine['tables'][key] = {'goals': goals, 'next_colours': next_colours, 'first_colour': first_colour_number,
+                                 'distances': distances, 'reachable': bytearray(distance >= 0 for distance in distances)}
+    return engine['tables'][key]
+
+def answer_query(engine, goal_cells, palette, first_colour, start_cells):
+    """Function that perform search in the maze of the engine (see search_compiled).
+       Input:
+           engine - dictionary, created by create_query_engine;
+           goal_cells - list or tuple of tuples of two integers, collection of the goal cells;
+           palette - dictionary, consisted of strings, where keys are colours for the path and values are corresponding next colours;
+           first_colour - string, colour of the first coloured gate from the palette;
+           start_cells - list or tuple of tuples of two integers, collection of the starting cells.
+       Output:
+           if some search is successful - return phrase corresponding to that search;
+           if all searches are failed - return False."""
+    compiled_maze = engine['compiled_maze']
+    num_cols = compiled_maze['num_cols']
+    tables = get_query_tables(engine, goal_cells, palette, first_colour)
+    num_colours = len(tables['next_colours'])
+    for (col,row) in start_cells:
+        cell = row*num_cols + col
+        if not tables['reachable'][cell*num_colours + tables['first_colour']]:
+            continue
+        phrase = depth_first_search_compiled(compiled_maze, (cell,), tables['first_colour'], '', tables['goals'],
+                                             tables['next_colours'], tables['reachable'])
+        if phrase:
+            return phrase
+    return False
+
+def answer_queries(engine, goal_cells, queries, processes = None):
+    """Function that answers a batch of queries of search in the maze of the engine,
+       either in this process or in a pool of processes, where the engine is sent to every process once.
+       Input:
+           engine - dictionary, created by create_query_engine;
+           goal_cells - list or tuple of tuples of two integers, collection of the goal cells;
+           queries - list or tuple of tuples of three elements: palette, first colour and start cells (see answer_query);
+           processes - integer: number of processes in the pool; if None, then queries are answered in this process.
+       Output:
+           list of answers (see answer_query) in the order of queries."""
+    # tables for all palettes are computed once before search
+    for (palette, first_colour, start_cells) in queries:
+        get_query_tables(engine, goal_cells, palette, first_colour)
+    if processes is None:
+        return [answer_query(engine, goal_cells, palette, first_colour, start_cells)
+                for (palette, first_colour, start_cells) in queries]
+    portable_engine = dict(engine, compiled_maze = get_portable_maze(engine['compiled_maze']))
+    with multiprocessing.Pool(processes, initializer = init_query_worker, initargs = (portable_engine, goal_cells)) as pool:
+        return pool.map(answer_query_in_worker, queries)
+
+def init_query_worker(engine, goal_cells):
+    """Function that prepares a process of the pool in answer_queries for answering queries.
+       Input:
+           engine - dictionary, created by create_query_engine, where the compiled maze is prepared by get_portable_maze;
+           goal_cells - list or tuple of tuples of two integers, collection of the goal cells."""
+    worker_settings['engine'] = dict(engine, compiled_maze = get_maze_from_portable(engine['compiled_maze']))
+    worker_settings['goal_cells'] = goal_cells
+
+def answer_query_in_worker(query):
+    """Function that answers one query in a process of the pool in answer_queries.
+       Input:
+           query - tuple of three elements: palette, first colour and start cells (see answer_query).
+       Output:
+           answer to the query (see answer_query)."""
+    palette, first_colour, start_cells = query
+    return answer_query(worker_settings['engine'], worker_settings['goal_cells'], palette, first_colour, start_cells)
+
+def search_compiled(compiled_maze, start_cells, goal_cells, palette, first_colour):
+    """Function that perform depth-first search in the compiled maze from the multiple start cells to the goal cells
+       according to the colours in palette and first colour; it returns the same phrases as search.
+       Input:
+           compiled_maze - dictionary represented the compiled maze (see compile_maze);
+           start_cells - list or tuple of tuples of two integers, collection of the starting cells;
+           goal_cells - list or tuple of tuples of two integers, collection of the goal cells;
+           palette - dictionary, consisted of strings, where keys are colours for the path and values are corresponding next colours;
+           first_colour - string, colour of the first coloured gate from the palette.
+       Output:
+           if some search is successful - return phrase corresponding to that search;
+           if all searches are failed - return False."""
+    engine = create_query_engine(compiled_maze)
+    return answer_query(engine, goal_cells, palette, first_colour, start_cells)
+
+def iter_phrases(maze, start_cells, goal_cells, palette, first_colour):
+    """Function that generates different phrases of all paths in the maze from the multiple start cells to the goal cells
+       according to the colours in palette and first colour; the first phrase is the same as search returns.
+       Input:
+           maze - dictionary represented a maze (see generate_maze) or the compiled maze (see compile_maze);
+           start_cells - list or tuple of tuples of two integers, collection of the starting cells;
+           goal_cells - list or tuple of tuples of two integers, collection of the goal cells;
+           palette - dictionary, consisted of strings, where keys are colours for the path and values are corresponding next colours;
+           first_colour - string, colour of the first coloured gate from the palette.
+       Output:
+           generator that will generate non-empty phrases in the order of sequential search, each phrase once."""
+    engine = create_query_engine(maze)
+    compiled_maze = engine['compiled_maze']
+    num_cols = compiled_maze['num_cols']
+    tables = get_query_tables(engine, goal_cells, palette, first_colour)
+    # subtrees without goal cells are remembered for all start cells
+    dead_ends = {}
+    phrases = set()
+    for (col,row) in start_cells:
+        cell = row*num_cols + col
+        if not tables['reachable'][cell*len(tables['next_colours']) + tables['first_colour']]:
+            continue
+        for phrase in iter_phrases_with_dead_ends(compiled_maze, cell, tables, dead_ends):
+            if phrase not in phrases:
+                phrases.add(phrase)
+                yield phrase
+
+def count_phrases(maze, start_cells, goal_cells, palette, first_colour, limit = None):
+    """Function that counts different phrases of all paths in the maze from the multiple start cells to the goal cells
+       according to the colours in palette and first colour.
+       Input:
+           maze - dictionary represented a maze (see generate_maze) or the compiled maze (see compile_maze);
+           start_cells - list or tuple of tuples of two integers, collection of the starting cells;
+           goal_cells - list or tuple of tuples of two integers, collection of the goal cells;
+           palette - dictionary, consisted of strings, where keys are colours for the path and values are corresponding next colours;
+           first_colour - string, colour of the first coloured gate from the palette;
+           limit - integer or None: if it is an integer, then counting stops, when limit phrases are found;
+           for example, limit = 2 is enough to check that the maze is unambiguous.
+       Output:
+           integer: number of different non-empty phrases (but not more than limit)."""
+    num_phrases = 0
+    for phrase in iter_phrases(maze, start_cells, goal_cells, palette, first_colour):
+        num_phrases += 1
+        if num_phrases == limit:
+            break
+    return num_phrases
+
+def iter_phrases_with_dead_ends(compiled_maze, start_cell, tables, dead_ends):
+    """Function that generates phrases of all acyclic paths in the compiled maze from the start cell to the goal cells
+       in depth-first order (see iter_compiled_phrases), and remembers subtrees of search without goal cells.
+       Subtree from a cell with colour has no goal cells for every set of visited cells, that contains the visited cells,
+       which blocked movements in that subtree, so such subtrees are skipped.
+       Input:
+           compiled_maze - dictionary represented the compiled maze (see compile_maze);
+           start_cell - integer: number of the start cell;
+           tables - dictionary of tables for search (see get_query_tables);
+           dead_ends - dictionary, where keys are states (see get_reachable_table) and values are lists of bitmasks
+           of the visited cells, that blocked movements in subtrees without goal cells; it is updated by the search.
+       Output:
+           generator that will generate non-empty phrases of the paths."""
+    neighbours = compiled_maze['neighbours']
+    gate_colours = compiled_maze['gate_colours']
+    slots_letters = compiled_maze['letters']
+    goals = tables['goals']
+    next_colours = tables['next_colours']
+    reachable = tables['reachable']
+    num_cells = len(goals)
+    num_colours = len(next_colours)
+    if goals[start_cell]:
+        return
+    # for every depth of the path: cell, colour of the next coloured gate, next slot to try, whether letter was added,
+    # whether some goal cell was reached and bitmask of the cells before that depth, that blocked movements
+    cells = array.array('i', [0]) * num_cells
+    colours = array.array('i', [0]) * num_cells
+    next_slots = array.array('i', [0]) * num_cells
+    added_letters = bytearray(num_cells)
+    found_goals = bytearray(num_cells)
+    blocking_cells = [0] * num_cells
+    visited = bytearray(num_cells)
+    visited_cells = 1 << start_cell
+    letters = []
+    depth = 0
+    cells[0] = start_cell
+    colours[0] = tables['first_colour']
+    next_slots[0] = 4*start_cell
+    visited[start_cell] = 1
+    while depth >= 0:
+        cell = cells[depth]
+        slot = next_slots[depth]
+        if slot == 4*cell + 4:
+            # all movements from the cell are tried
+            if not found_goals[depth]:
+                # only the last few subtrees are remembered for every state to keep checks cheap
+                state_dead_ends = dead_ends.setdefault(cell*num_colours + colours[depth], [])
+                if len(state_dead_ends) == max_dead_ends_per_state:
+                    state_dead_ends.pop(0)
+                state_dead_ends.append(blocking_cells[depth])
+            if depth > 0:
+                if found_goals[depth]:
+                    found_goals[depth - 1] = 1
+                else:
+                    blocking_cells[depth - 1] |= blocking_cells[depth] & ~(1 << cell)
+                visited[cell] = 0
+                visited_cells ^= 1 << cell
+                if added_letters[depth]:
+                    letters.pop()
+            depth -= 1
+            continue
+        next_slots[depth] = slot + 1
+        near_cell = neighbours[slot]
+        if near_cell < 0:
+            continue
+        # required path is acyclic
+        if visited[near_cell]:
+            blocking_cells[depth] |= 1 << near_cell
+            continue
+        gate_colour = gate_colours[slot]
+        colour = colours[depth]
+        if gate_colour < 0:
+            next_colour = colour
+            letter = 0
+        elif gate_colour == colour:
+            next_colour = next_colours[colour]
+            if next_colour < 0:
+                continue
+            letter = slots_letters[slot]
+        else:
+            continue
+        state = near_cell*num_colours + next_colour
+        if not reachable[state]:
+            continue
+        if goals[near_cell]:
+            found_goals[depth] = 1
+            if letters or letter:
+                yield ''.join(letters) + (chr(letter) if letter else '')
+            continue
+        # skip subtree, that is known to have no goal cells with the current visited cells
+        if state in dead_ends:
+            near_visited_cells = visited_cells | (1 << near_cell)
+            for dead_end_cells in dead_ends[state]:
+                if dead_end_cells & near_visited_cells == dead_end_cells:
+                    blocking_cells[depth] |= dead_end_cells & ~(1 << near_cell)
+                    break
+            else:
+                dead_end_cells = None
+            if dead_end_cells is not None:
+                continue
+        # move to the near cell
+        depth += 1
+        cells[depth] = near_cell
+        colours[depth] = next_colour
+        next_slots[depth] = 4*near_cell
+        added_letters[depth] = letter > 0
+        found_goals[depth] = 0
+        blocking_cells[depth] = 0
+        visited[near_cell] = 1
+        visited_cells |= 1 << near_cell
+        if letter:
+            letters.append(chr(letter))
+
+def search_in_parallel(maze, start_cells, goal_cells, palette, first_colour, processes = None, split_depth = 2, all_results = False):
+    """Function that perform search in the maze from the multiple start cells to the goal cells in a pool of processes,
+       where search is split to subproblems: start cell with the first split_depth movements from it.
+       Input:
+           maze - dictionary represented a maze (see generate_maze) or the compiled maze (see compile_maze);
+           start_cells - list or tuple of tuples of two integers, collection of the starting cells;
+           goal_cells - list or tuple of tuples of two integers, collection of the goal cells;
+           palette - dictionary, consisted of strings, where keys are colours for the path and values are corresponding next colours;
+           first_colour - string, colour of the first coloured gate from the palette;
+           processes - integer: number of processes in the pool; if None, then the number of CPUs is used;
+           split_depth - integer: number of the first movements, that define a subproblem;
+           all_results - boolean: if False, then the search stops when the phrase is found,
+           otherwise phrases of all paths are found.
+       Output:
+           if all_results is False: the same phrase as search returns, that is the phrase of the first successful subproblem
+           in the order of sequential search, or False, if all searches are failed (other subproblems are cancelled);
+           if all_results is True: list of non-empty phrases of all paths in the order of sequential search."""
+    engine = create_query_engine(maze)
+    compiled_maze = engine['compiled_maze']
+    num_cols = compiled_maze['num_cols']
+    tables = get_query_tables(engine, goal_cells, palette, first_colour)
+    subproblems = []
+    for (col,row) in start_cells:
+        cell = row*num_cols + col
+        if tables['reachable'][cell*len(tables['next_colours']) + tables['first_colour']]:
+            subproblems.extend(split_search(compiled_maze, (cell,), tables['first_colour'], '', tables, split_depth))
+    phrases = []
+    with multiprocessing.Pool(processes, initializer = init_search_worker, initargs = (get_portable_maze(compiled_maze), tables, all_results)) as pool:
+        # results are received in the order of subproblems, while later subproblems are solved at the same time
+        for result in pool.imap(search_subproblem_in_worker, subproblems):
+            if all_results:
+                phrases.extend(result)
+            elif result:
+                # leaving the pool terminates the processes, that solve other subproblems
+                return result
+    if all_results:
+        return phrases
+    return False
+
+def split_search(compiled_maze, path, colour, phrase, tables, split_depth):
+    """Function that splits search from the last cell of the path to subproblems in the order of sequential search.
+       Input:
+           compiled_maze - dictionary represented the compiled maze (see compile_maze);
+           path - tuple of integers: numbers of all cells on the path made so far;
+           colour - integer: number of colour of the next coloured gate on the path;
+           phrase - string, it's a phrase, generated so far;
+           tables - dictionary of tables for search (see get_query_tables);
+           split_depth - integer: number of movements, that are added to the path.
+       Output:
+           generator that will generate subproblems as tuples of path, colour and phrase;
+           paths are extended by split_depth movements or end in the goal cells."""
+    cell = path[-1]
+    if split_depth == 0 or tables['goals'][cell]:
+        yield (path, colour, phrase)
+        return
+    for (near_cell, next_colour, letter) in get_compiled_moves(compiled_maze, cell, colour, tables['next_colours'], tables['reachable']):
+        # required path is acyclic
+        if near_cell not in path:
+            yield from split_search(compiled_maze, path + (near_cell,), next_colour, phrase + letter, tables, split_depth - 1)
+
+def get_compiled_moves(compiled_maze, cell, colour, next_colours, reachable):
+    """Function that for the current cell and colour of the compiled maze will find available near cells,
+       from which the goal cells can be reached, in the same order as iter_compiled_phrases.
+       Input:
+           compiled_maze - dictionary represented the compiled maze (see compile_maze);
+           cell - integer: number of the current cell;
+           colour - integer: number of colour of the next coloured gate;
+           next_colours - list of integers: numbers of the next colours (see compile_palette);
+           reachable - bytearray: states, from which the goal cells can be reached (see get_reachable_table).
+       Output:
+           generator that will yield tuples of three elements: number of the near cell, number of the following colour
+           and string: letter of the phrase or empty string."""
+    neighbours = compiled_maze['neighbours']
+    gate_colours = compiled_maze['gate_colours']
+    slots_letters = compiled_maze['letters']
+    num_colours = len(next_colours)
+    for slot in range(4*cell, 4*cell + 4):
+        near_cell = neighbours[slot]
+        if near_cell < 0:
+            continue
+        gate_colour = gate_colours[slot]
+        if gate_colour < 0:
+            next_colour = colour
+            letter = ''
+        elif gate_colour == colour and next_colours[colour] >= 0:
+            next_colour = next_colours[colour]
+            letter = chr(slots_letters[slot]) if slots_letters[slot] else ''
+        else:
+            continue
+        if reachable[near_cell*num_colours + next_colour]:
+            yield (near_cell, next_colour, letter)
+
+def init_search_worker(compiled_maze, tables, all_results):
+    """Function that prepares a process of the pool in search_in_parallel for solving subproblems.
+       Input:
+           compiled_maze - compiled maze, prepared by get_portable_maze;
+           tables - dictionary of tables for search (see get_query_tables);
+           all_results - boolean: whether phrases of all paths should be found."""
+    worker_settings['compiled_maze'] = get_maze_from_portable(compiled_maze)
+    worker_settings['tables'] = tables
+    worker_settings['all_results'] = all_results
+
+def search_subproblem_in_worker(subproblem):
+    """Function that solves one subproblem in a process of the pool in search_in_parallel.
+       Input:
+           subproblem - tuple of path, colour and phrase (see split_search).
+       Output:
+           if all results should be found - list of non-empty phrases of all paths of the subproblem;
+           otherwise the first non-empty phrase or False."""
+    path, colour, phrase = subproblem
+    tables = worker_settings['tables']
+    arguments = (worker_settings['compiled_maze'], path, colour, phrase, tables['goals'], tables['next_colours'], tables['reachable'])
+    if worker_settings['all_results']:
+        return [generated_phrase for generated_phrase in iter_compiled_phrases(*arguments) if generated_phrase]
+    return depth_first_search_compiled(*arguments)
+
+def depth_first_search_compiled(compiled_maze, path, colour, phrase, goals, next_colours, reachable):
+    """Function that performs search in depth-first fashion in the compiled maze from the last cell of the path to the goal cells.
+       Input:
+           compiled_maze - dictionary represented the compiled maze (see compile_maze);
+           path - list or tuple of integers: numbers of all cells on the path made so far;
+           colour - integer: number of colour of the next coloured gate on the path;
+           phrase - string, it's a phrase, generated so far;
+           goals - bytearray: for every number of cell 1, if it is a goal cell, and 0 otherwise;
+           next_colours - list of integers: numbers of the next colours (see compile_palette);
+           reachable - bytearray: states, from which the goal cells can be reached (see get_reachable_table).
+       Output:
+           if search is successful, function will return string, that is a generated phrase;
+           otherwise it will return False."""
+    for generated_phrase in iter_compiled_phrases(compiled_maze, path, colour, phrase, goals, next_colours, reachable):
+        if generated_phrase:
+            return generated_phrase
+    return False
+
+def iter_compiled_phrases(compiled_maze, path, colour, phrase, goals, next_colours, reachable):
+    """Function that generates phrases of all acyclic paths in the compiled maze from the last cell of the path to the goal cells
+       in depth-first order; paths end in the first goal cell on them.
+       Search uses explicit stack instead of recursion: the path is kept in the preallocated array with flags of visited cells,
+       and the phrase is made from the stack of letters only when a goal cell is reached.
+       Input:
+           compiled_maze - dictionary represented the compiled maze (see compile_maze);
+           path - list or tuple of integers: numbers of all cells on the path made so far;
+           colour - integer: number of colour of the next coloured gate on the path;
+           phrase - string, it's a phrase, generated so far;
+           goals - bytearray: for every number of cell 1, if it is a goal cell, and 0 otherwise;
+           next_colours - list of integers: numbers of the next colours (see compile_palette);
+           reachable - bytearray: states, from which the goal cells can be reached (see get_reachable_table).
+       Output:
+           generator that will generate strings: phrases of the paths, that can also be empty strings."""
+    neighbours = compiled_maze['neighbours']
+    gate_colours = compiled_maze['gate_colours']
+    slots_letters = compiled_maze['letters']
+    num_cells = len(goals)
+    num_colours = len(next_colours)
+    if goals[path[-1]]:
+        yield phrase
+        return
+    # for every depth of the path: cell, colour of the next coloured gate, next slot to try and whether letter was added
+    cells = array.array('i', [0]) * num_cells
+    colours = array.array('i', [0]) * num_cells
+    next_slots = array.array('i', [0]) * num_cells
+    added_letters = bytearray(num_cells)
+    visited = bytearray(num_cells)
+    letters = list(phrase)
+    for cell in path:
+        visited[cell] = 1
+    first_depth = depth = len(path) - 1
+    cells[depth] = path[-1]
+    colours[depth] = colour
+    next_slots[depth] = 4*path[-1]
+    while depth >= first_depth:
+        cell = cells[depth]
+        slot = next_slots[depth]
+        if slot == 4*cell + 4:
+            # all movements from the cell are tried, so return to the previous cell
+            if depth > first_depth:
+                visited[cell] = 0
+                if added_letters[depth]:
+                    letters.pop()
+            depth -= 1
+            continue
+        next_slots[depth] = slot + 1
+        near_cell = neighbours[slot]
+        # required path is acyclic
+        if near_cell < 0 or visited[near_cell]:
+            continue
+        gate_colour = gate_colours[slot]
+        colour = colours[depth]
+        # gate has no colour
+        if gate_colour < 0:
+            next_colour = colour
+            letter = 0
+        # gate has the same colour
+        elif gate_colour == colour:
+            next_colour = next_colours[colour]
+            if next_colour < 0:
+                continue
+            letter = slots_letters[slot]
+        # gate has a different colour
+        else:
+            continue
+        if not reachable[near_cell*num_colours + next_colour]:
+            continue
+        if goals[near_cell]:
+            if letter:
+                yield ''.join(letters) + chr(letter)
+            else:
+                yield ''.join(letters)
+            continue
+        # move to the near cell
+        depth += 1
+        cells[depth] = near_cell
+        colours[depth] = next_colour
+        next_slots[depth] = 4*near_cell
+        visited[near_cell] = 1
+        added_letters[depth] = letter > 0
+        if letter:
+            letters.append(chr(letter))
+
 def search(maze, start_cells, goal_cells, palette, first_colour):
     """Function that perform depth-first search in the maze from the multiple start cells to the goal cells
        according to the colours in palette and first colour.
@@ -160,6 +951,16 @@ def get_near_cells_with_letters_and_colours(maze, cell, colour, palette):
             near_cell = (col+1,row)
         yield (near_cell, letter, next_colour)
   
+# signature at the beginning of the binary file of a maze (see save_maze)
+maze_file_signature = b'CATWALK1'
+
+# number of subtrees without goal cells, that are remembered for every state (see iter_phrases_with_dead_ends)
+max_dead_ends_per_state = 4
+
+# settings of a process, that answers queries in answer_queries (see init_query_worker)
+# or solves subproblems in search_in_parallel (see init_search_worker)
+worker_settings = {}
+
 # number of columns in the maze
 num_cols = 26
 # number of rows in the maze;
@@ -340,13 +1141,18 @@ gray_palette = {'gray':'gray'}
 rbg_palette = {'red':'blue','blue':'green','green':'red'}
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        # convert the maze in the puzzle to the binary file with the given path
+        convert_maze_definitions(sys.argv[1])
+        sys.exit()
     # generate the maze in the puzzle
     maze = generate_maze(num_cols, num_rows, imaginary_cells,
                          cells_on_the_left_edge, cells_on_the_right_edge, cells_with_right_border_inside_maze, 
                          cells_with_right_gate_by_colours, cells_with_upper_gate_by_colours)
+    compiled_maze = compile_maze(maze)
     # command to exctract the first message in the puzzle
-    phrase = search(maze,start_cells,goal_cells, gray_palette,'gray')
+    phrase = search_compiled(compiled_maze,start_cells,goal_cells, gray_palette,'gray')
     print(phrase)
     # command to extract the second message in the puzzle
-    phrase = search(maze,start_cells,goal_cells, rbg_palette,'red')
+    phrase = search_compiled(compiled_maze,start_cells,goal_cells, rbg_palette,'red')
     print(phrase)
@@ -1,6 +1,17 @@
+import csv
+import os
+import random
 import string
+import sys
+import tempfile
+import time
 
-def solve_clocks(clocks_data,n):
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def solve_clocks(clocks_data,n,backend = 'python'):
     """Function that extracts messages from clocks for the puzzle Mr. Game & Watch from MUMS Puzzle Hunt 2011 competition:     
        English - https://wondrousnet.blogspot.com/2024/01/solution-to-puzzle-mr-game-watch.html 
        Russian - https://wondrousnet.blogspot.com/2024/01/mr-game-watch.html
@@ -12,9 +23,16 @@ def solve_clocks(clocks_data,n):
                4) boolean - it is about type of formula, used to compute the number of minutes:
                   if True, then minutes = (2/11)*(30*hours + angle);
                   if False, then minutes = (2/11)*(30*hours + angle - 360).
-           n - integer: number of exctracted messages.
+           n - integer: number of exctracted messages;
+           backend - string: way to compute time values and messages:
+               'python' - clocks are processed one by one;
+               'numpy' - clocks are processed by whole-array operations (see solve_clocks_columns).
        Output:
            string of uppercase messages for corresponding time values separated by the new line symbol."""    
+    if backend == 'numpy':
+        return solve_clocks_columns(*get_clocks_columns(clocks_data), n)
+    if backend != 'python':
+        raise ValueError("Unknown backend: " + str(backend))
     all_clocks_values = []
     # we collecting time values for clocks from bigger to smoller
     for clock in clocks_data:
@@ -24,7 +42,7 @@ def solve_clocks(clocks_data,n):
             hours = clock[0]
         elif clock[1] == 'pm':
             hours = 12 + clock[0]
-        if hours == 0:
+        if hours < 1 or hours > 26:
             raise ValueError("Time units must be from 1 to 26")
         clock_values += (hours,)
         # compute value for minutes
@@ -41,6 +59,52 @@ def solve_clocks(clocks_data,n):
             clock_values += (actual_time,)
             current_value = (current_value - actual_time)*60
         all_clocks_values.append(clock_values)
+    return get_messages(all_clocks_values, get_orderings(all_clocks_values, n))
+
+def get_orderings(all_clocks_values, n):
+    """Function that computes orderings of the clocks for all messages.
+       For the message with index i > 0 clocks are sorted by time values with index i-1,
+       and clocks with the same values retain their order for the previous message.
+       Since time values are from 1 to 26, every ordering is computed from the previous one by the counting sort.
+       Input:
+           all_clocks_values - list of tuples of integers: time values of the clocks;
+           n - integer: number of messages.
+       Output:
+           list of lists of indexes of the clocks: ordering for every message."""
+    ordering = list(range(len(all_clocks_values)))
+    orderings = [ordering]
+    for i in range(1, n):
+        column = [clock_values[i-1] for clock_values in all_clocks_values]
+        buckets = [[] for value in range(27)]
+        for index in ordering:
+            buckets[column[index]].append(index)
+        ordering = [index for bucket in buckets for index in bucket]
+        orderings.append(ordering)
+    return orderings
+
+def get_messages(all_clocks_values, orderings):
+    """Function that constructs every message by gathering of time values of the clocks in the corresponding ordering.
+       Input:
+           all_clocks_values - list of tuples of integers: time values of the clocks;
+           orderings - list of lists of indexes of the clocks: ordering for every message (see get_orderings).
+       Output:
+           string of uppercase messages separated by the new line symbol."""
+    letters = string.ascii_uppercase
+    all_messages = ''
+    for i, ordering in enumerate(orderings):
+        letters_column = [letters[clock_values[i] - 1] for clock_values in all_clocks_values]
+        all_messages += ''.join(map(letters_column.__getitem__, ordering)) + '\n'
+    return all_messages
+
+def get_messages_by_sorting(all_clocks_values, n):
+    """Function that constructs messages by sorting of the time values for every message,
+       as it was done by solve_clocks originally; it is used as the reference in benchmark_solve_clocks.
+       Input:
+           all_clocks_values - list of tuples of integers: time values of the clocks;
+           n - integer: number of messages.
+       Output:
+           string of uppercase messages separated by the new line symbol."""
+    all_clocks_values = list(all_clocks_values)
     all_messages = ''
     letters = string.ascii_uppercase
     # i is an index of the mesure of time, for which we want to construct the message
@@ -59,6 +123,341 @@ def solve_clocks(clocks_data,n):
         all_messages += message + '\n'
     return all_messages
 
+def get_clocks_columns(clocks_data):
+    """Function that converts the clocks to columns for solve_clocks_columns.
+       Input:
+           clocks_data: list or tuple of tuples, each of which represents one corresponding clock (see solve_clocks).
+       Output:
+           tuple of four NumPy arrays: hours, times of day, angles and types of formula of the clocks."""
+    if numpy is None:
+        raise ImportError("NumPy is required for the 'numpy' backend")
+    hours = numpy.array([clock[0] for clock in clocks_data], dtype = numpy.int64)
+    times_of_day = numpy.array([clock[1] for clock in clocks_data], dtype = object)
+    angles = numpy.array([clock[2] for clock in clocks_data], dtype = numpy.float64)
+    formula_flags = numpy.array([clock[3] for clock in clocks_data], dtype = bool)
+    return hours, times_of_day, angles, formula_flags
+
+def get_clocks_values(hours, times_of_day, angles, formula_flags, n, first_row = 0):
+    """Function that computes time values of all clocks by whole-array operations.
+       Floating-point operations are the same as in solve_clocks, so values are the same too.
+       Input:
+           hours - array of integers from 0 to 11: numbers of hours of the clocks;
+           times_of_day - array of strings 'am' or 'pm' or array of booleans (True for 'pm'): times of day of the clocks;
+           angles - array of floats: angles between the minute hand and the hour hand of the clocks;
+           formula_flags - array of booleans: types of formula, used to compute the number of minutes (see solve_clocks);
+           n - integer: number of time values for every clock;
+           first_row - integer: index of the first clock, used in messages of errors.
+       Output:
+           NumPy array of bytes with row for every clock and column for every measure of time."""
+    if numpy is None:
+        raise ImportError("NumPy is required for the 'numpy' backend")
+    hours = numpy.asarray(hours, dtype = numpy.int64)
+    times_of_day = numpy.asarray(times_of_day)
+    angles = numpy.asarray(angles, dtype = numpy.float64)
+    formula_flags = numpy.asarray(formula_flags, dtype = bool)
+    num_clocks = len(hours)
+    if len(times_of_day) != num_clocks or len(angles) != num_clocks or len(formula_flags) != num_clocks:
+        raise ValueError("Columns of the clocks must have the same length")
+    if times_of_day.dtype == bool:
+        is_pm = times_of_day
+    else:
+        is_pm = times_of_day == 'pm'
+        wrong_rows = numpy.flatnonzero(~is_pm & (times_of_day != 'am'))
+        if len(wrong_rows):
+            raise ValueError("Time of day must be 'am' or 'pm' in rows " + get_rows_string(wrong_rows + first_row))
+    # time values are from 1 to 26, so they are stored in bytes
+    clocks_values = numpy.empty((num_clocks, n), dtype = numpy.uint8)
+    hours_values = hours + 12*is_pm
+    wrong = (hours_values < 1) | (hours_values > 26)
+    clocks_values[:, 0] = numpy.where(wrong, 1, hours_values)
+    # in the second formula 360 is subtracted from the same sum, as in solve_clocks
+    current_values = 30*hours + angles
+    current_values = numpy.where(formula_flags, current_values, current_values - 360)
+    current_values = (2/11)*current_values
+    with numpy.errstate(invalid = 'ignore', over = 'ignore'):
+        for i in range(1, n):
+            actual_times = numpy.trunc(current_values)
+            # values of the wrong clocks are not used further, so they are replaced by valid ones
+            wrong |= ~((actual_times >= 1) & (actual_times <= 26))
+            actual_times[wrong] = 1
+            clocks_values[:, i] = actual_times
+            current_values = (current_values - actual_times)*60
+    wrong_rows = numpy.flatnonzero(wrong)
+    if len(wrong_rows):
+        raise ValueError("Time units must be from 1 to 26 in rows " + get_rows_string(wrong_rows + first_row))
+    return clocks_values
+
+def solve_clocks_columns(hours, times_of_day, angles, formula_flags, n):
+    """Function that extracts messages from clocks, given by columns, by whole-array operations.
+       Result is the same as for solve_clocks.
+       Input:
+           hours, times_of_day, angles, formula_flags - columns of the clocks (see get_clocks_values);
+           n - integer: number of exctracted messages.
+       Output:
+           string of uppercase messages for corresponding time values separated by the new line symbol."""
+    clocks_values = get_clocks_values(hours, times_of_day, angles, formula_flags, n)
+    return get_messages_from_columns(clocks_values, get_column_orderings(clocks_values))
+
+def get_column_orderings(clocks_values):
+    """Function that computes orderings of the clocks for all messages (see get_orderings) by whole-array operations.
+       Stable sorting of bytes in NumPy is the radix sort, so every ordering is computed in linear time.
+       Input:
+           clocks_values - NumPy array of bytes with row for every clock and column for every measure of time.
+       Output:
+           NumPy array of integers with row for every message: ordering of the clocks for this message."""
+    num_clocks, n = clocks_values.shape
+    orderings = numpy.empty((n, num_clocks), dtype = numpy.intp)
+    orderings[0] = numpy.arange(num_clocks)
+    for i in range(1, n):
+        ordering = orderings[i-1]
+        orderings[i] = ordering[numpy.argsort(clocks_values[ordering, i-1], kind = 'stable')]
+    return orderings
+
+def get_messages_from_columns(clocks_values, orderings):
+    """Function that constructs all messages by one gathering of time values of the clocks in the orderings.
+       Input:
+           clocks_values - NumPy array of bytes with row for every clock and column for every measure of time;
+           orderings - NumPy array of integers: ordering of the clocks for every message (see get_column_orderings).
+       Output:
+           string of uppercase messages separated by the new line symbol."""
+    n, num_clocks = orderings.shape
+    letters = numpy.frombuffer(('\n' + string.ascii_uppercase).encode('ascii'), dtype = numpy.uint8)
+    # the last column of zeros is used for new line symbols
+    gathered_values = numpy.zeros((n, num_clocks + 1), dtype = numpy.uint8)
+    gathered_values[:, :num_clocks] = clocks_values[orderings, numpy.arange(n)[:, None]]
+    return letters[gathered_values].tobytes().decode('ascii')
+
+def benchmark_solve_clocks(num_clocks = 1000000, n = 5, seed = 0):
+    """Function that compares time of construction of messages by sorting for every message (get_messages_by_sorting)
+       and by orderings, computed by counting sorts (get_orderings) and by NumPy (get_column_orderings).
+       Input:
+           num_clocks - integer: number of clocks with random time values;
+           n - integer: number of messages;
+           seed - seed for the random number generator.
+       Output:
+           dictionary with time in seconds for every way."""
+    generator = random.Random(seed)
+    all_clocks_values = [tuple(generator.randint(1, 26) for i in range(n)) for index in range(num_clocks)]
+    timings = {}
+    start_time = time.perf_counter()
+    messages = get_messages_by_sorting(all_clocks_values, n)
+    timings['sorting'] = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    counting_messages = get_messages(all_clocks_values, get_orderings(all_clocks_values, n))
+    timings['counting'] = time.perf_counter() - start_time
+    if counting_messages != messages:
+        raise AssertionError("Messages by counting sorts differ from messages by sorting")
+    if numpy is not None:
+        clocks_values = numpy.array(all_clocks_values, dtype = numpy.uint8).reshape(num_clocks, n)
+        start_time = time.perf_counter()
+        numpy_messages = get_messages_from_columns(clocks_values, get_column_orderings(clocks_values))
+        timings['numpy'] = time.perf_counter() - start_time
+        if numpy_messages != messages:
+            raise AssertionError("Messages by NumPy differ from messages by sorting")
+    return timings
+
+def decode_clocks_stream(chunks, n, output_stream, block_size = 1 << 16, temp_dir = None):
+    """Function that extracts messages from the clocks, that come by chunks, and writes them to the stream.
+       Only time values of the clocks are kept between chunks, one byte for every measure of time,
+       so the clocks themselves are never stored all together.
+       Time values and orderings of the clocks are kept in temporary files, that are mapped to memory (numpy.memmap),
+       and they are processed by blocks, so the memory for arrays doesn't depend on the number of clocks,
+       and clocks, that need more memory than there is, are decoded too: the operating system keeps in memory
+       only recently used pages of the files. Temporary files take n + 8 bytes for every clock
+       (orderings are arrays of 4-byte integers, if there are less than 2**32 clocks).
+       The first message is written while chunks come, and other messages are written after the last chunk.
+       Input:
+           chunks - iterable of tuples of four columns of the clocks: hours, times of day, angles and types of formula
+               (see get_clocks_values and read_clocks_file);
+           n - integer: number of exctracted messages;
+           output_stream - text stream for messages, separated by the new line symbol (the same as result of solve_clocks);
+           block_size - integer: number of clocks, that are sorted or written at once;
+           temp_dir - string: directory for temporary files; if None, then the default directory of tempfile is used."""
+    if numpy is None:
+        raise ImportError("NumPy is required for decoding of the stream of clocks")
+    letters = numpy.frombuffer(string.ascii_uppercase.encode('ascii'), dtype = numpy.uint8)
+    with tempfile.TemporaryDirectory(dir = temp_dir) as directory:
+        # time values of all clocks and numbers of clocks with every time value for every measure of time
+        column_paths = [os.path.join(directory, 'column' + str(i)) for i in range(n)]
+        values_counts = numpy.zeros((n, 27), dtype = numpy.int64)
+        num_clocks = 0
+        column_files = [open(column_path, 'wb') for column_path in column_paths]
+        try:
+            for chunk in chunks:
+                clocks_values = get_clocks_values(*chunk, n, first_row = num_clocks)
+                for i in range(n):
+                    column_files[i].write(clocks_values[:, i].tobytes())
+                    values_counts[i] += numpy.bincount(clocks_values[:, i], minlength = 27)
+                num_clocks += len(clocks_values)
+                # clocks in the first message are in the original order
+                output_stream.write(letters[clocks_values[:, 0] - 1].tobytes().decode('ascii'))
+        finally:
+            for column_file in column_files:
+                column_file.close()
+        output_stream.write('\n')
+        if num_clocks == 0:
+            # empty files can't be mapped to memory
+            output_stream.write('\n' * (n - 1))
+            return
+        index_type = numpy.uint32 if num_clocks < 2**32 else numpy.intp
+        ordering = numpy.memmap(os.path.join(directory, 'ordering0'), dtype = index_type, mode = 'w+', shape = (num_clocks,))
+        next_ordering = numpy.memmap(os.path.join(directory, 'ordering1'), dtype = index_type, mode = 'w+', shape = (num_clocks,))
+        for start in range(0, num_clocks, block_size):
+            ordering[start:start + block_size] = numpy.arange(start, min(start + block_size, num_clocks), dtype = index_type)
+        for i in range(1, n):
+            # the next ordering is computed from the previous one (see get_column_orderings)
+            get_next_ordering(ordering, numpy.memmap(column_paths[i-1], dtype = numpy.uint8, mode = 'r'), values_counts[i-1],
+                              block_size, next_ordering)
+            ordering, next_ordering = next_ordering, ordering
+            write_message(ordering, numpy.memmap(column_paths[i], dtype = numpy.uint8, mode = 'r'), output_stream, block_size)
+        # files are unmapped before they are removed
+        del ordering, next_ordering
+
+def get_next_ordering(ordering, column, values_counts, block_size = 1 << 16, next_ordering = None):
+    """Function that sorts the clocks in the ordering by their time values with the counting sort,
+       where the ordering is processed by blocks, so the only array of the size of the ordering is the result.
+       Clocks with the same values retain their order (see get_orderings).
+       Input:
+           ordering - NumPy array of integers: indexes of the clocks;
+           column - NumPy array of bytes: time values of all clocks;
+           values_counts - NumPy array of 27 integers: number of clocks in the ordering with every time value;
+           block_size - integer: number of clocks, that are processed at once;
+           next_ordering - NumPy array of integers of the same size and type as ordering for the result, or None.
+       Output:
+           NumPy array of integers of the same type as ordering: the next ordering."""
+    if next_ordering is None:
+        next_ordering = numpy.empty_like(ordering)
+    # index in the next ordering for the next clock with every time value
+    next_positions = numpy.cumsum(values_counts) - values_counts
+    for start in range(0, len(ordering), block_size):
+        block = numpy.asarray(ordering[start:start + block_size])
+        block_values = column[block]
+        block_ordering = numpy.argsort(block_values, kind = 'stable')
+        sorted_values = block_values[block_ordering]
+        block_counts = numpy.bincount(block_values, minlength = 27)
+        # position of every clock of the block among clocks of the block with the same value
+        ranks = numpy.arange(len(block)) - (numpy.cumsum(block_counts) - block_counts)[sorted_values]
+        next_ordering[next_positions[sorted_values] + ranks] = block[block_ordering]
+        next_positions += block_counts
+    return next_ordering
+
+def write_message(ordering, column, output_stream, block_size = 1 << 16):
+    """Function that writes the message: letters for time values of the clocks in the ordering, by blocks.
+       Input:
+           ordering - NumPy array of integers: indexes of the clocks;
+           column - NumPy array of bytes: time values of all clocks;
+           output_stream - text stream for the message;
+           block_size - integer: number of clocks, that are written at once."""
+    letters = numpy.frombuffer(string.ascii_uppercase.encode('ascii'), dtype = numpy.uint8)
+    for start in range(0, len(ordering), block_size):
+        block = numpy.asarray(ordering[start:start + block_size])
+        output_stream.write(letters[column[block] - 1].tobytes().decode('ascii'))
+    output_stream.write('\n')
+
+def read_clocks_file(file_path, chunk_size = 1 << 16, file_format = None):
+    """Function that reads the clocks from the file by chunks.
+       Input:
+           file_path - string: path of the file;
+           chunk_size - integer: maximum number of clocks in one chunk;
+           file_format - string: 'csv' (see read_clocks_csv) or 'binary' (see read_clocks_binary);
+               if None, then format is 'csv' for files with extension '.csv' and 'binary' otherwise.
+       Output:
+           generator of tuples of four columns of the clocks (see decode_clocks_stream)."""
+    if file_format is None:
+        file_format = 'csv' if file_path.lower().endswith('.csv') else 'binary'
+    if file_format == 'csv':
+        return read_clocks_csv(file_path, chunk_size)
+    if file_format == 'binary':
+        return read_clocks_binary(file_path, chunk_size)
+    raise ValueError("Unknown format of the file: " + str(file_format))
+
+def read_clocks_csv(file_path, chunk_size = 1 << 16):
+    """Function that reads the clocks from the CSV file by chunks.
+       Every line of the file represents one clock with four fields (see solve_clocks):
+       number of hours, time of day ('am' or 'pm'), angle and type of formula ('True' or 'False', '1' or '0').
+       Input:
+           file_path - string: path of the file;
+           chunk_size - integer: maximum number of clocks in one chunk.
+       Output:
+           generator of tuples of four columns of the clocks (see decode_clocks_stream)."""
+    formula_values = {'true': True, '1': True, 'false': False, '0': False}
+    with open(file_path, newline = '') as clocks_file:
+        hours, times_of_day, angles, formula_flags = [], [], [], []
+        for row_index, row in enumerate(csv.reader(clocks_file)):
+            try:
+                if len(row) != 4:
+                    raise ValueError("Clock must have four fields")
+                hours.append(int(row[0]))
+                times_of_day.append(row[1].strip())
+                angles.append(float(row[2]))
+                formula_flags.append(formula_values[row[3].strip().lower()])
+            except (ValueError, KeyError):
+                raise ValueError("Wrong clock in row " + str(row_index) + " of the file " + file_path)
+            if len(hours) == chunk_size:
+                yield hours, times_of_day, angles, formula_flags
+                hours, times_of_day, angles, formula_flags = [], [], [], []
+        if hours:
+            yield hours, times_of_day, angles, formula_flags
+
+def read_clocks_binary(file_path, chunk_size = 1 << 16):
+    """Function that reads the clocks from the binary file (see write_clocks_binary) by chunks.
+       Records are read to NumPy arrays directly, without Python objects for clocks.
+       Input:
+           file_path - string: path of the file;
+           chunk_size - integer: maximum number of clocks in one chunk.
+       Output:
+           generator of tuples of four columns of the clocks (see decode_clocks_stream)."""
+    if numpy is None:
+        raise ImportError("NumPy is required for reading of the binary file of clocks")
+    record_type = numpy.dtype(clock_record_format)
+    with open(file_path, 'rb') as clocks_file:
+        if clocks_file.read(len(clocks_file_signature)) != clocks_file_signature:
+            raise ValueError("File " + file_path + " is not a file of clocks")
+        while True:
+            data = clocks_file.read(chunk_size*record_type.itemsize)
+            if not data:
+                break
+            if len(data) % record_type.itemsize:
+                raise ValueError("File " + file_path + " ends with incomplete clock")
+            records = numpy.frombuffer(data, dtype = record_type)
+            yield records['hours'], records['pm'].astype(bool), records['angle'], records['formula'].astype(bool)
+
+def write_clocks_binary(clocks_data, file_path):
+    """Function that writes the clocks to the binary file, that can be read by read_clocks_binary.
+       File consists of 8 bytes of signature and records for every clock (see clock_record_format).
+       Input:
+           clocks_data: list or tuple of tuples, each of which represents one corresponding clock (see solve_clocks);
+           file_path - string: path of the file."""
+    if numpy is None:
+        raise ImportError("NumPy is required for writing of the binary file of clocks")
+    records = numpy.empty(len(clocks_data), dtype = clock_record_format)
+    hours, times_of_day, angles, formula_flags = get_clocks_columns(clocks_data)
+    records['hours'] = hours
+    records['pm'] = times_of_day == 'pm'
+    records['angle'] = angles
+    records['formula'] = formula_flags
+    with open(file_path, 'wb') as clocks_file:
+        clocks_file.write(clocks_file_signature)
+        clocks_file.write(records.tobytes())
+
+def get_rows_string(rows, max_rows = 10):
+    """Function that represents indexes of the rows for messages of errors.
+       Input:
+           rows - array of integers: indexes of the rows;
+           max_rows - integer: maximum number of indexes in the representation.
+       Output:
+           string with indexes of the rows."""
+    rows_string = ', '.join(str(row) for row in rows[:max_rows])
+    if len(rows) > max_rows:
+        rows_string += ' and ' + str(len(rows) - max_rows) + ' more'
+    return rows_string
+
+# signature at the beginning of the binary file of clocks (see write_clocks_binary)
+clocks_file_signature = b'CLOCKS01'
+
+# record of one clock in the binary file: number of hours, 1 for 'pm' and 0 for 'am', angle and type of formula
+clock_record_format = [('hours', '<i1'), ('pm', '<u1'), ('angle', '<f8'), ('formula', '<u1')]
+
 #representation of the clocks from the puzzle
 clocks_data = ((1,'am',69.47564,True),(0,'pm',29.35372,True),(4,'pm',-8.70545,True),(8,'am',-128.60642,True),
                (1,'am',-0.66474,True),(2,'am',-32.37728,True),(5,'am',-104.12833,True),(8,'pm',148.35595,False),
@@ -68,6 +467,15 @@ clocks_data = ((1,'am',69.47564,True),(0,'pm',29.35372,True),(4,'pm',-8.70545,Tr
                (8,'pm',-134.47923,True),(8,'am',164.75629,False),(5,'am',-44.09744,True),(2,'pm',40.46877,True))
 
 if __name__ == '__main__':
+    if sys.argv[1:2] == ['benchmark']:
+        # command to compare ways of construction of messages on random time values
+        for way, seconds in benchmark_solve_clocks(*map(int, sys.argv[2:])).items():
+            print(way + ': ' + format(seconds, '.3f') + ' s')
+        sys.exit()
+    if sys.argv[1:2] == ['decode']:
+        # command to extract messages from the file of clocks: decode <path> [<number of messages>]
+        decode_clocks_stream(read_clocks_file(sys.argv[2]), int(sys.argv[3]) if len(sys.argv) > 3 else 5, sys.stdout)
+        sys.exit()
     # command to extract all messages from the clocks in the puzzle
     messages = solve_clocks(clocks_data,5)
     print(messages)
@@ -1,4 +1,11 @@
-def search(start, finish, cols_in_left_part, cols_constr, left_rows_constr, right_rows_constr):
+import collections
+import heapq
+import multiprocessing
+import queue
+import random
+
+def search(start, finish, cols_in_left_part, cols_constr, left_rows_constr, right_rows_constr, prune_interval = 0, stats = None,
+           propagate_interval = 0, table_size = 0, return_state = False):
     """Function for finding a path in the grid for the puzzle Tracks from MUMS Puzzle Hunt 2008 competition.
        Russian - https://wondrousnet.blogspot.com/2024/04/blog-post.html
        English - https://wondrousnet.blogspot.com/2024/05/solution-to-puzzle-tracks.html
@@ -8,132 +15,978 @@ def search(start, finish, cols_in_left_part, cols_constr, left_rows_constr, righ
            cols_in_left_part - integer: number of cols in the left part of the grid;
            cols_constr - list of integers: constraints for the cols of the grid;
            left_rows_constr - list of integers: constraints for the rows in the left part of the grid;
-           right_rows_constr - list of integers: constraints for the rows in the right part of the grid.
+           right_rows_constr - list of integers: constraints for the rows in the right part of the grid;
+           prune_interval - integer: if positive, then connectivity and parity of the remaining grid are checked (see get_pruning_rule)
+               at every depth of search, divisible by this number;
+           stats - dictionary for counters of search (see create_search_stats) or None;
+           propagate_interval - integer: if positive, then forced and impossible cells are deduced (see propagate_constraints)
+               at every depth of search, divisible by this number, and search follows forced moves without branching;
+           table_size - integer: if positive, then states of search, from which the finish can't be reached, are remembered
+               in the transposition table of this size (see find_failed_state) and are not explored again;
+           return_state - boolean: whether the state of search is returned together with the path.
        Output:
            if search is successful, the function will return tuple of tuples of two integers: path from the start cell to the finish cell;
-           otherwise the function will return False."""
-    cols_constr = list(cols_constr)
-    left_rows_constr = list(left_rows_constr)
-    right_rows_constr = list(right_rows_constr)
+           otherwise the function will return False;
+           if return_state is True, then the function will return tuple of the path (or False) and the state of search (see create_search_state),
+           which corresponds to the found path, so state['visited'] is the bitset of its cells (see extract_message)."""
+    state = create_search_state(start, finish, cols_in_left_part, cols_constr, left_rows_constr, right_rows_constr, prune_interval, stats,
+                                propagate_interval, table_size)
+    path = depth_first_search((start,), state)
+    if return_state:
+        return path, state
+    return path
+
+def iter_paths(start, finish, cols_in_left_part, cols_constr, left_rows_constr, right_rows_constr, prune_interval = 0, stats = None,
+               propagate_interval = 0, table_size = 0):
+    """Function that finds all paths in the grid for the puzzle Tracks, that satisfy the constraints.
+       Input:
+           start, finish, cols_in_left_part, cols_constr, left_rows_constr, right_rows_constr - the grid and constraints (see search);
+           prune_interval, stats, propagate_interval, table_size - settings and counters of search (see search).
+       Output:
+           generator that will yield tuples of tuples of two integers: paths from the start cell to the finish cell
+           in the order of search (so the first of them is returned by search)."""
+    state = create_search_state(start, finish, cols_in_left_part, cols_constr, left_rows_constr, right_rows_constr, prune_interval, stats,
+                                propagate_interval, table_size)
+    yield from iter_depth_first_search((start,), state)
+
+def count_paths(start, finish, cols_in_left_part, cols_constr, left_rows_constr, right_rows_constr, limit = None, prune_interval = 0,
+                stats = None, propagate_interval = 0, table_size = 0):
+    """Function that counts paths in the grid for the puzzle Tracks, that satisfy the constraints (see iter_paths).
+       Input:
+           start, finish, cols_in_left_part, cols_constr, left_rows_constr, right_rows_constr - the grid and constraints (see search);
+           limit - integer: if it is not None, then counting stops, when this number of paths is found
+               (for example, limit = 2 is enough to check, that the path is unique);
+           prune_interval, stats, propagate_interval, table_size - settings and counters of search (see search).
+       Output:
+           integer: number of paths (not more than limit)."""
+    num_paths = 0
+    for path in iter_paths(start, finish, cols_in_left_part, cols_constr, left_rows_constr, right_rows_constr, prune_interval, stats,
+                           propagate_interval, table_size):
+        num_paths += 1
+        if num_paths == limit:
+            break
+    return num_paths
+
+def create_search_state(start, finish, cols_in_left_part, cols_constr, left_rows_constr, right_rows_constr, prune_interval = 0, stats = None,
+                        propagate_interval = 0, table_size = 0):
+    """Function that creates the state of search, in which constraints are updated in place by apply_move and undo_move.
+       Sums of constraints for the cols and for the rows (in both parts of the grid together)
+       are kept in Fenwick trees, so that sums before and after any col or row are computed in logarithmic time.
+       Input:
+           start - tuple of two integers: start cell of the grid;
+           finish - tuple of two integers: finish cell of the grid;
+           cols_in_left_part - integer: number of cols in the left part of the grid;
+           cols_constr - list of integers: constraints for the cols of the grid;
+           left_rows_constr - list of integers: constraints for the rows in the left part of the grid;
+           right_rows_constr - list of integers: constraints for the rows in the right part of the grid;
+           prune_interval - integer: interval of depths for checks of connectivity and parity (see search);
+           stats - dictionary for counters of search (see create_search_stats) or None;
+           propagate_interval - integer: interval of depths for propagation of constraints (see search);
+           table_size - integer: size of the transposition table (see search).
+       Output:
+           dictionary with keys:
+               'finish', 'cols_in_left_part', 'num_cols', 'num_rows' - parameters of the grid;
+               'cols_constr' - list of integers: remaining constraints for the cols;
+               'rows_constr' - list of two lists of integers: remaining constraints for the rows in the left and in the right part;
+               'cols_tree', 'rows_tree' - Fenwick trees of remaining constraints for the cols and for the rows;
+               'cols_total', 'rows_total' - integers: sums of remaining constraints for the cols and for the rows;
+               'visited' - integer: bitset of the cells of the path, where the cell (col, row) corresponds to the bit row*num_cols + col;
+               'status' - bytearray with status of every cell (the same as bits in 'visited') for propagation of constraints
+                   (see propagate_constraints): 0 - unknown, 1 - must be visited, 2 - must be avoided, 3 - visited;
+                   or None, if propagate_interval isn't positive; the following keys are used only with statuses:
+               'line_cells' - list of lists of indexes of the cells for every line: every col and then every row
+                   in the left and in the right part of the grid;
+               'cell_lines' - list of tuples of two integers: col line and row line of every cell;
+               'neighbours' - list of lists of indexes of the adjacent cells for every cell (see get_neighbour_indexes);
+               'possible_counts', 'must_visit_counts' - lists of integers: numbers of cells with status 0 or 1
+                   and with status 1 in every line;
+               'degrees' - list of integers: number of adjacent cells with status 0 or 1 for every cell;
+               'moves' - list of tuples of index and previous status of every cell of the path;
+               'trail', 'trail_marks' - list of indexes of the cells, which status is deduced, and its length
+                   before deductions after every move, so that deductions are undone together with the move;
+               'propagated' - list of lengths of the path, for which deductions are made completely;
+               'line_queued', 'cell_queued' - bytearrays of flags of lines and cells in the queues of propagation;
+               'prune_interval' - integer: interval of depths for checks of connectivity and parity;
+               'propagate_interval' - integer: interval of depths for propagation of constraints;
+               'stats' - dictionary of counters of search;
+               'node_budget' - integer: maximum number of nodes, visited by one call of depth_first_search, or None;
+               'unexplored' - list of paths, that start subtrees, not explored by depth_first_search because of node_budget;
+               'zobrist_keys', 'current_keys' - lists of random 64-bit integers for every cell: keys of the cell as visited and as current;
+               'hash' - integer: XOR of keys of the visited cells;
+               'table' - ordered dictionary: transposition table of failed states (see find_failed_state), or None;
+               'table_size' - integer: maximum size of the transposition table."""
+    num_rows = len(left_rows_constr)
+    num_cols = len(cols_constr)
+    parts_cols = (range(min(cols_in_left_part, num_cols)), range(max(cols_in_left_part, 0), num_cols))
+    state = {'finish': finish, 'cols_in_left_part': cols_in_left_part,
+             'num_cols': len(cols_constr), 'num_rows': num_rows,
+             'cols_constr': list(cols_constr), 'rows_constr': [list(left_rows_constr), list(right_rows_constr)],
+             'cols_tree': create_fenwick_tree(cols_constr),
+             'rows_tree': create_fenwick_tree([left_rows_constr[row] + right_rows_constr[row] for row in range(num_rows)]),
+             'cols_total': sum(cols_constr), 'rows_total': sum(left_rows_constr) + sum(right_rows_constr), 'visited': 0,
+             'status': None, 'prune_interval': prune_interval, 'propagate_interval': propagate_interval,
+             'stats': create_search_stats() if stats is None else stats, 'node_budget': None, 'unexplored': [],
+             'hash': 0, 'table': collections.OrderedDict() if table_size > 0 else None, 'table_size': table_size}
+    # keys are the same for all states, so that hashes are the same in all processes
+    generator = random.Random(num_cols*num_rows)
+    state['zobrist_keys'] = [generator.getrandbits(64) for index in range(num_cols*num_rows)]
+    state['current_keys'] = [generator.getrandbits(64) for index in range(num_cols*num_rows)]
+    if propagate_interval > 0:
+        num_cells = num_cols*num_rows
+        line_cells = [[row*num_cols + col for row in range(num_rows)] for col in range(num_cols)]
+        for part_cols in parts_cols:
+            line_cells.extend([row*num_cols + col for col in part_cols] for row in range(num_rows))
+        cell_lines = [None]*num_cells
+        for line in range(num_cols, len(line_cells)):
+            for index in line_cells[line]:
+                cell_lines[index] = (index % num_cols, line)
+        neighbours = [get_neighbour_indexes(index, num_cols, num_rows) for index in range(num_cells)]
+        state.update({'status': bytearray(num_cells), 'line_cells': line_cells, 'cell_lines': cell_lines, 'neighbours': neighbours,
+                      'possible_counts': [len(cells) for cells in line_cells], 'must_visit_counts': [0]*len(line_cells),
+                      'degrees': [len(next_indexes) for next_indexes in neighbours], 'moves': [], 'trail': [], 'trail_marks': [],
+                      'propagated': [], 'line_queued': bytearray(len(line_cells)), 'cell_queued': bytearray(num_cells)})
+        # the finish cell must be visited
+        finish_index = finish[1]*num_cols + finish[0]
+        state['status'][finish_index] = 1
+        for line in cell_lines[finish_index]:
+            state['must_visit_counts'][line] += 1
     start_col, start_row = start[0], start[1]
-    # set active and inactive rows constraints for the start cell
-    if start_col < cols_in_left_part:
-        active_rows_constr = left_rows_constr
-        inactive_rows_constr = right_rows_constr
-    else:
-        active_rows_constr = right_rows_constr
-        inactive_rows_constr = left_rows_constr
     # update constraints according to the start cell
-    if cols_constr[start_col] > 0 and active_rows_constr[start_row] > 0:
-        cols_constr[start_col] -= 1
-        active_rows_constr[start_row] -= 1
+    if state['cols_constr'][start_col] > 0 and state['rows_constr'][get_part(start_col, state)][start_row] > 0:
+        apply_move(state, start)
     else:
         raise ValueError("Start cell shoud have non-zero values of constraints.")
-    path = depth_first_search((start,), finish, cols_in_left_part, cols_constr, active_rows_constr, inactive_rows_constr)
-    return path
+    return state
+
+def create_search_stats():
+    """Function that creates counters of search.
+       Output:
+           dictionary with keys:
+               'nodes' - number of visited nodes of the tree of search;
+               'checks' - number of checks of connectivity and parity (see get_pruning_rule);
+               'finish', 'parity', 'cols', 'rows' - numbers of nodes, cut by the corresponding rule;
+               'propagations' - number of propagations of constraints (see propagate_constraints);
+               'contradictions' - number of nodes, cut by propagation of constraints;
+               'forced' - number of nodes, where propagation of constraints left the only move;
+               'table_hits', 'table_misses' - numbers of nodes, found and not found in the transposition table;
+               'table_stores', 'table_evictions' - numbers of failed states, stored to the transposition table and removed from it."""
+    return {'nodes': 0, 'checks': 0, 'finish': 0, 'parity': 0, 'cols': 0, 'rows': 0,
+            'propagations': 0, 'contradictions': 0, 'forced': 0,
+            'table_hits': 0, 'table_misses': 0, 'table_stores': 0, 'table_evictions': 0}
+
+def get_part(col, state):
+    """Function that finds the part of the grid for the given col.
+       Input:
+           col - integer: given col;
+           state - dictionary represented the state of search (see create_search_state).
+       Output:
+           integer: 0 for the left part of the grid and 1 for the right part."""
+    return 0 if col < state['cols_in_left_part'] else 1
+
+def apply_move(state, cell):
+    """Function that updates constraints in the state of search according to passage to the given cell.
+       Input:
+           state - dictionary represented the state of search (see create_search_state);
+           cell - tuple of two integers: given cell."""
+    col, row = cell[0], cell[1]
+    state['cols_constr'][col] -= 1
+    state['rows_constr'][0 if col < state['cols_in_left_part'] else 1][row] -= 1
+    add_to_fenwick_tree(state['cols_tree'], col, -1)
+    add_to_fenwick_tree(state['rows_tree'], row, -1)
+    state['cols_total'] -= 1
+    state['rows_total'] -= 1
+    index = row*state['num_cols'] + col
+    state['visited'] |= 1 << index
+    state['hash'] ^= state['zobrist_keys'][index]
+    status = state['status']
+    if status is not None:
+        previous_status = status[index]
+        if previous_status < 2:
+            # the cell is not possible for the rest of the path anymore
+            for line in state['cell_lines'][index]:
+                state['possible_counts'][line] -= 1
+                state['must_visit_counts'][line] -= previous_status
+            degrees = state['degrees']
+            for next_index in state['neighbours'][index]:
+                degrees[next_index] -= 1
+        status[index] = 3
+        state['moves'].append((index, previous_status))
+        state['trail_marks'].append(len(state['trail']))
+
+def undo_move(state, cell):
+    """Function that restores constraints in the state of search, changed by apply_move for the given cell.
+       Input:
+           state - dictionary represented the state of search (see create_search_state);
+           cell - tuple of two integers: given cell."""
+    col, row = cell[0], cell[1]
+    state['cols_constr'][col] += 1
+    state['rows_constr'][0 if col < state['cols_in_left_part'] else 1][row] += 1
+    add_to_fenwick_tree(state['cols_tree'], col, 1)
+    add_to_fenwick_tree(state['rows_tree'], row, 1)
+    state['cols_total'] += 1
+    state['rows_total'] += 1
+    index = row*state['num_cols'] + col
+    state['visited'] &= ~(1 << index)
+    state['hash'] ^= state['zobrist_keys'][index]
+    status = state['status']
+    if status is not None:
+        undo_deductions(state)
+        state['trail_marks'].pop()
+        index, previous_status = state['moves'].pop()
+        status[index] = previous_status
+        if previous_status < 2:
+            for line in state['cell_lines'][index]:
+                state['possible_counts'][line] += 1
+                state['must_visit_counts'][line] += previous_status
+            degrees = state['degrees']
+            for next_index in state['neighbours'][index]:
+                degrees[next_index] += 1
+
+def undo_deductions(state):
+    """Function that undoes statuses of the cells, deduced by propagate_constraints after the last move.
+       Input:
+           state - dictionary represented the state of search (see create_search_state)."""
+    status = state['status']
+    trail = state['trail']
+    mark = state['trail_marks'][-1]
+    while len(trail) > mark:
+        index = trail.pop()
+        previous_status = status[index]
+        status[index] = 0
+        for line in state['cell_lines'][index]:
+            if previous_status == 1:
+                state['must_visit_counts'][line] -= 1
+            else:
+                state['possible_counts'][line] += 1
+        if previous_status == 2:
+            degrees = state['degrees']
+            for next_index in state['neighbours'][index]:
+                degrees[next_index] += 1
+    propagated = state['propagated']
+    while propagated and propagated[-1] >= len(state['moves']):
+        propagated.pop()
 
-def depth_first_search(path, finish, cols_in_left_part, cols_constr, active_rows_constr, inactive_rows_constr):
+def depth_first_search(path, state):
     """Function that performs depth-first search in the grid from a current cell to the finish cell according to the given constraints.
+       Search is made without recursion: the path is extended and shortened as a stack of moves,
+       and cells of the path are checked by the bitset of visited cells in the state of search.
+       If search is successful, the state of search will correspond to the found path (in particular, state['visited'] is its bitset);
+       otherwise the state will be the same as before search.
+       If state['node_budget'] is not None, then search stops, when this number of nodes is visited,
+       and state['unexplored'] will contain paths, that start the rest of subtrees, in the order of search.
        Input:
            path - tuple of tuples of two integers: path made so far from the start cell;
-           finish - tuple of two integers: goal cell of search;
-           cols_in_left_part - integer: number of cols in the left part of the grid;
-           cols_constr - list of integers: constraints for the cols of the grid;
-           active_rows_constr - list of integers: active constraints for the rows of the grid;
-           inactive_rows_constr - list of integers: inactive constraints for the rows of the grid.
+           state - dictionary represented the state of search after passage of the path (see create_search_state).
        Output:
            if search is successful, the function will return tuple of tuples of two integers: path from the start cell to the finish cell;
            otherwise the function will return False."""
-    current_cell = path[-1]
-    # if current cell is a finish cell and constraints are satisfied, than path is found
-    if current_cell == finish and sum(cols_constr) == 0:
-        return path
-    # find perspective adjacent cells for the current cell with corresponding constraints
-    next_state = get_next_state(current_cell, finish, cols_in_left_part, cols_constr, active_rows_constr, inactive_rows_constr)
-    for (adjacent_cell, next_cols_constr, next_active_rows_constr, next_inactive_rows_constr) in next_state:
-        # we assume, that path is acyclic
-        if adjacent_cell not in path:
-            extended_path = path + (adjacent_cell,)
-            final_path = depth_first_search(extended_path, finish, cols_in_left_part, next_cols_constr, next_active_rows_constr, next_inactive_rows_constr)
-            if final_path:
-                return final_path
+    for found_path in iter_depth_first_search(path, state):
+        return found_path
     return False
+
+def iter_depth_first_search(path, state):
+    """Function that performs depth-first search in the grid from a current cell to the finish cell (see depth_first_search)
+       and finds all paths, that satisfy the constraints.
+       When a path is generated, the state of search corresponds to it; after the end of search the state will be the same as before search.
+       Input:
+           path - tuple of tuples of two integers: path made so far from the start cell;
+           state - dictionary represented the state of search after passage of the path (see create_search_state).
+       Output:
+           generator that will yield tuples of tuples of two integers: paths from the start cell to the finish cell in the order of search."""
+    finish = state['finish']
+    num_cols = state['num_cols']
+    stats = state['stats']
+    node_budget = state['node_budget']
+    table = state['table']
+    num_nodes = 0
+    num_found_paths = 0
+    state['unexplored'] = []
+    path = list(path)
+    # for every cell, added to the path by search, and for the last cell of the given path:
+    # list of perspective adjacent cells, index of the next of them to try and number of found paths before the cell
+    moves_stack = []
+    current_cell = path[-1]
+    while True:
+        if node_budget is not None and num_nodes >= node_budget:
+            stop_search(path, moves_stack, state)
+            return
+        num_nodes += 1
+        stats['nodes'] += 1
+        # number of found paths before the node, so that the node, which path is found, isn't stored as failed
+        num_previous_paths = num_found_paths
+        # if current cell is a finish cell and constraints are satisfied, than path is found
+        # (and it can't be extended, since constraints for all cols are equal to zero)
+        if current_cell == finish and state['cols_total'] == 0:
+            num_found_paths += 1
+            yield tuple(path)
+            adjacent_cells = []
+        elif table is not None and find_failed_state(current_cell, state):
+            adjacent_cells = []
+        else:
+            adjacent_cells = get_moves(current_cell, len(path) - 1, state)
+        moves_stack.append([adjacent_cells, 0, num_previous_paths])
+        # make the next move, returning back along the path, if there are no moves from its last cell
+        while True:
+            moves = moves_stack[-1]
+            adjacent_cells, index = moves[0], moves[1]
+            visited = state['visited']
+            # we assume, that path is acyclic
+            while index < len(adjacent_cells) and visited >> (adjacent_cells[index][1]*num_cols + adjacent_cells[index][0]) & 1:
+                index += 1
+            if index < len(adjacent_cells):
+                moves[1] = index + 1
+                current_cell = adjacent_cells[index]
+                apply_move(state, current_cell)
+                path.append(current_cell)
+                break
+            moves = moves_stack.pop()
+            # no paths are found from the last cell of the path
+            if table is not None and moves[2] == num_found_paths:
+                store_failed_state(path[-1], state)
+            if not moves_stack:
+                if state['status'] is not None:
+                    undo_deductions(state)
+                return
+            undo_move(state, path.pop())
         
-def get_next_state(cell, finish, cols_in_left_part, cols_constr, active_rows_constr, inactive_rows_constr):
-    """Function that for the given cell, in accordance with the given constraints, generate possible adjacent cells, perspective for subsequent search,
-       with constraints, corresponding to passage to that cells.
+def find_failed_state(cell, state):
+    """Function that checks, whether the current state of search is stored in the transposition table as failed.
+       State of search is defined by the current cell and the set of visited cells, since remaining constraints
+       and the depth of search depend only on them, so the finish can't be reached from the same state by another path.
+       The key of the state in the table is its Zobrist hash: XOR of random keys of visited cells and the key of the current cell,
+       and the value is the current cell with the bitset of visited cells, so that collisions of hashes are detected.
+       Input:
+           cell - tuple of two integers: current cell;
+           state - dictionary represented the state of search (see create_search_state).
+       Output:
+           boolean: whether the state is failed."""
+    index = cell[1]*state['num_cols'] + cell[0]
+    key = state['hash'] ^ state['current_keys'][index]
+    table = state['table']
+    stats = state['stats']
+    if table.get(key) == (index, state['visited']):
+        table.move_to_end(key)
+        stats['table_hits'] += 1
+        return True
+    stats['table_misses'] += 1
+    return False
+
+def store_failed_state(cell, state):
+    """Function that stores the current state of search to the transposition table as failed (see find_failed_state);
+       if the table is full, then the least recently used state is removed.
+       Input:
+           cell - tuple of two integers: current cell;
+           state - dictionary represented the state of search (see create_search_state)."""
+    index = cell[1]*state['num_cols'] + cell[0]
+    key = state['hash'] ^ state['current_keys'][index]
+    table = state['table']
+    stats = state['stats']
+    if key in table:
+        table.move_to_end(key)
+    else:
+        stats['table_stores'] += 1
+        if len(table) >= state['table_size']:
+            table.popitem(last = False)
+            stats['table_evictions'] += 1
+    table[key] = (index, state['visited'])
+
+def get_moves(cell, depth, state):
+    """Function that finds perspective adjacent cells for the current cell of search (see get_next_state),
+       after checks of connectivity and parity (see get_pruning_rule) and propagation of constraints (see propagate_constraints),
+       if they are made at the given depth.
+       Input:
+           cell - tuple of two integers: current cell, that is not the finish cell or constraints are not satisfied yet;
+           depth - integer: number of moves in the path, made so far;
+           state - dictionary represented the state of search (see create_search_state).
+       Output:
+           list of tuples of two integers: adjacent cells."""
+    stats = state['stats']
+    prune_interval = state['prune_interval']
+    propagate_interval = state['propagate_interval']
+    # check, whether the rest of the grid still allows to finish the path
+    if prune_interval > 0 and depth % prune_interval == 0:
+        stats['checks'] += 1
+        rule = get_pruning_rule(cell, state)
+        if rule:
+            stats[rule] += 1
+            return []
+    # find perspective adjacent cells for the current cell
+    adjacent_cells = get_next_state(cell, state)
+    status = state['status']
+    if status is None:
+        return adjacent_cells
+    # exclude moves to cells, that must be avoided according to deductions made so far
+    num_cols = state['num_cols']
+    adjacent_cells = [adjacent_cell for adjacent_cell in adjacent_cells if status[adjacent_cell[1]*num_cols + adjacent_cell[0]] != 2]
+    # make new deductions and follow the forced move
+    if adjacent_cells and depth % propagate_interval == 0:
+        stats['propagations'] += 1
+        forced_cell = propagate_constraints(cell, state)
+        if forced_cell is None:
+            stats['contradictions'] += 1
+            return []
+        if forced_cell:
+            stats['forced'] += 1
+            return [forced_cell] if forced_cell in adjacent_cells else []
+        adjacent_cells = [adjacent_cell for adjacent_cell in adjacent_cells if status[adjacent_cell[1]*num_cols + adjacent_cell[0]] != 2]
+    return adjacent_cells
+
+def stop_search(path, moves_stack, state):
+    """Function that stops depth-first search, when the budget of nodes is spent: the state of search is returned back
+       to the state before search, and paths, that start not explored subtrees, are stored in state['unexplored']
+       in the order of search: the current path and then untried moves from the last cell of the path to the first one.
+       Input:
+           path - list of tuples of two integers: current path of search, the last cell of which is not explored;
+           moves_stack - list of lists of perspective adjacent cells and indexes of the next of them (see iter_depth_first_search);
+           state - dictionary represented the state of search (see create_search_state)."""
+    num_cols = state['num_cols']
+    unexplored = [tuple(path)]
+    undo_move(state, path.pop())
+    while moves_stack:
+        adjacent_cells, index = moves_stack.pop()[:2]
+        visited = state['visited']
+        for adjacent_cell in adjacent_cells[index:]:
+            if not visited >> (adjacent_cell[1]*num_cols + adjacent_cell[0]) & 1:
+                unexplored.append(tuple(path) + (adjacent_cell,))
+        if moves_stack:
+            undo_move(state, path.pop())
+    if state['status'] is not None:
+        undo_deductions(state)
+    state['unexplored'] = unexplored
+
+def get_next_state(cell, state):
+    """Function that for the given cell, in accordance with constraints in the state of search, finds possible adjacent cells, perspective for subsequent search;
+       passage to that cells is made by apply_move.
        Input:
            cell - tuple of two integers: given cell;
-           finish - tuple of two integers: finish cell;
-           cols_in_left_part - integer: number of cols in the left part of the grid;
-           cols_constr - list of integers: constraints for the cols of the grid;
-           active_rows_constr - list of integers: active constraints for the rows of the grid;
-           inactive_rows_constr - list of integers: inactive constraints for the rows of the grid.
-       Output:
-           generator that will yield tuples of four elements:
-               1) tuple of two integers: adjacent cell;
-               2) list of integers: constraints for the cols of the grid, corresponding to passage to that cell;
-               3) list of integers: active constraints for the rows of the grid, corresponding to passage to that cell;
-               4) list of integers: inactive constraints for the rows of the grid, corresponding to passage to that cell."""
-    num_cols = len(cols_constr)
-    num_rows = len(active_rows_constr)
+           state - dictionary represented the state of search (see create_search_state).
+       Output:
+           list of tuples of two integers: adjacent cells."""
+    num_cols = state['num_cols']
+    num_rows = state['num_rows']
+    cols_constr = state['cols_constr']
+    rows_constr = state['rows_constr']
+    cols_in_left_part = state['cols_in_left_part']
+    finish_col, finish_row = state['finish'][0], state['finish'][1]
     col, row = cell[0], cell[1]
-    for direction in ('horizontal','vertical'):
-        for move in (+1,-1):
-            next_active_rows_constr = active_rows_constr
-            next_inactive_rows_constr = inactive_rows_constr
-            if direction == 'horizontal':
-                next_col = col + move
-                #next col is inside grid
-                if next_col >= 0 and next_col < num_cols:
-                    next_row = row
-                else:
+    adjacent_cells = []
+    for (next_col, next_row) in ((col + 1, row), (col - 1, row), (col, row + 1), (col, row - 1)):
+        # next cell is inside grid
+        if next_col < 0 or next_col >= num_cols or next_row < 0 or next_row >= num_rows:
+            continue
+        # when we move from the left part of the grid to the right, or from right to the left,
+        # constraints for the rows in the other part become active
+        next_part = 0 if next_col < cols_in_left_part else 1
+        # extract values of constraints for the next col and next row
+        next_col_value = cols_constr[next_col]
+        next_row_value = rows_constr[next_part][next_row]
+        # constraints are allow to make the move
+        if next_col_value > 0 and next_row_value > 0:
+            # if value of constraints for the next col will be zero after move,
+            # and there is some col before the next col and finish col or after the next col and finish col
+            # with non-zero value of constraints,
+            # than this path can't led to solution and should be abandoned
+            if next_col_value == 1:
+                cols_tree = state['cols_tree']
+                if (next_col <= finish_col and get_fenwick_prefix_sum(cols_tree, next_col) > 0
+                    or
+                    next_col >= finish_col and state['cols_total'] - get_fenwick_prefix_sum(cols_tree, next_col + 1) > 0):
                     continue
-                # we move from the left part of the grid to the right, or from right to the left;
-                # so we should swap active and inactive constraints for the rows
-                if (col == cols_in_left_part - 1 and move == +1) or (col == cols_in_left_part and move == -1):
-                    next_active_rows_constr, next_inactive_rows_constr = next_inactive_rows_constr, next_active_rows_constr                 
-            elif direction == 'vertical':
-                next_row = row + move
-                # next row is inside grid
-                if next_row >=0 and next_row < num_rows:
-                    next_col = col
-                else:
+            # if value of active constraints for the next row will be zero after move,
+            # and value of inactive constraints for that row is also equal to zero,
+            # and there is some row before the next row and finish row or after the next row and finish row
+            # with non-zero value of active or inactive constraints,
+            # than this path can't led to solution and should be abandoned
+            # (constraints are non-negative, so sums for both parts of the grid are checked together)
+            if next_row_value == 1 and rows_constr[1 - next_part][next_row] == 0:
+                rows_tree = state['rows_tree']
+                if (next_row <= finish_row and get_fenwick_prefix_sum(rows_tree, next_row) > 0
+                    or
+                    next_row >= finish_row and state['rows_total'] - get_fenwick_prefix_sum(rows_tree, next_row + 1) > 0):
                     continue
-            # extract values of constraints for the next col and next row
-            next_col_value = cols_constr[next_col]
-            next_row_value = next_active_rows_constr[next_row]
-            # constraints are allow to make the move
-            if next_col_value > 0 and next_row_value > 0:
-                # if value of constraints for the next col will be zero after move,
-                # and there is some col before the next col and finish col or after the next col and finish col
-                # with non-zero value of constraints,
-                # than this path can't led to solution and should be abandoned
-                if next_col_value == 1:
-                    finish_col = finish[0]
-                    if (next_col <= finish_col and sum(cols_constr[:next_col])>0
-                        or
-                        next_col >= finish_col and sum(cols_constr[next_col+1:])>0):
-                        continue
-                # if value of active constraints for the next row will be zero after move,
-                # and value of inactive constraints for that row is also equal to zero,
-                # and there is some row before the next row and finish row or after the next row and finish row
-                # with non-zero value of active or inactive constraints,
-                # than this path can't led to solution and should be abandoned
-                if next_row_value == 1 and next_inactive_rows_constr[next_row] == 0:
-                    finish_row = finish[1]
-                    if (next_row <= finish_row and
-                        (sum(next_active_rows_constr[:next_row])>0 or sum(next_inactive_rows_constr[:next_row])>0)
-                        or
-                        next_row >= finish_row and
-                        (sum(next_active_rows_constr[next_row+1:])>0 or sum(next_inactive_rows_constr[next_row+1:])>0)):
-                        continue                   
-                adjacent_cell = (next_col, next_row)
-                next_cols_constr = list(cols_constr)
-                next_active_rows_constr = list(next_active_rows_constr)
-                next_cols_constr[next_col] -= 1
-                next_active_rows_constr[next_row] -= 1
-                yield (adjacent_cell, next_cols_constr, next_active_rows_constr, next_inactive_rows_constr)
+            adjacent_cells.append((next_col, next_row))
+    return adjacent_cells
+
+def get_pruning_rule(cell, state):
+    """Function that checks, whether the path, made so far, can be finished according to the remaining constraints.
+       Remaining cells of the path are not visited yet, and they have non-zero constraints for their col and row,
+       so they should be connected with the current cell through such cells. The following rules are checked:
+           'finish' - the finish cell is already passed or it is not connected with the current cell;
+           'parity' - the number of remaining moves doesn't correspond to the colours of the current and the finish cells on the chessboard;
+           'cols' - some col requires more cells, than there are connected cells in it;
+           'rows' - constraints for the rows allow less moves, than constraints for the cols require,
+               or some row in some part of the grid requires more cells, than there are connected cells in it
+               (the last rule is checked only if constraints for the rows and for the cols require the same number of moves,
+               since search stops, when constraints for the cols are satisfied).
+       Input:
+           cell - tuple of two integers: current cell, that is not the finish cell or constraints are not satisfied yet;
+           state - dictionary represented the state of search (see create_search_state).
+       Output:
+           string: name of the rule, that cuts the path, or None, if the path is perspective."""
+    finish = state['finish']
+    num_cols = state['num_cols']
+    visited = state['visited']
+    if cell == finish or visited >> (finish[1]*num_cols + finish[0]) & 1:
+        return 'finish'
+    # every move changes colour of the cell on the chessboard and decreases constraints by one
+    num_moves = state['cols_total']
+    if (cell[0] + cell[1] + num_moves - finish[0] - finish[1]) % 2:
+        return 'parity'
+    if state['rows_total'] < num_moves:
+        return 'rows'
+    num_rows = state['num_rows']
+    cols_in_left_part = state['cols_in_left_part']
+    cols_constr = state['cols_constr']
+    rows_constr = state['rows_constr']
+    # flood fill from the current cell through not visited cells with non-zero constraints
+    connected_in_cols = [0]*num_cols
+    connected_in_rows = [[0]*num_rows, [0]*num_rows]
+    reached = bytearray(num_cols*num_rows)
+    cells_to_fill = [cell]
+    while cells_to_fill:
+        col, row = cells_to_fill.pop()
+        for (next_col, next_row) in ((col + 1, row), (col - 1, row), (col, row + 1), (col, row - 1)):
+            if next_col < 0 or next_col >= num_cols or next_row < 0 or next_row >= num_rows:
+                continue
+            next_index = next_row*num_cols + next_col
+            if reached[next_index] or visited >> next_index & 1:
+                continue
+            next_part = 0 if next_col < cols_in_left_part else 1
+            if cols_constr[next_col] > 0 and rows_constr[next_part][next_row] > 0:
+                reached[next_index] = 1
+                connected_in_cols[next_col] += 1
+                connected_in_rows[next_part][next_row] += 1
+                cells_to_fill.append((next_col, next_row))
+    if not reached[finish[1]*num_cols + finish[0]]:
+        return 'finish'
+    for col in range(num_cols):
+        if cols_constr[col] > connected_in_cols[col]:
+            return 'cols'
+    if state['rows_total'] > num_moves:
+        return None
+    for part in (0, 1):
+        for row in range(num_rows):
+            if rows_constr[part][row] > connected_in_rows[part][row]:
+                return 'rows'
+    return None
+
+def propagate_constraints(cell, state):
+    """Function that deduces cells, that must be visited or must be avoided by the rest of the path, made so far,
+       and keeps them in state['status'] (see create_search_state) until the last move is undone.
+       The finish cell must be visited, and the following rules are applied until nothing changes:
+           if constraint for a col equals the number of its cells, that are not avoided or visited, then all of them must be visited;
+           if constraint for a col equals the number of its cells, that must be visited, then all other cells must be avoided;
+           the same for the rows in every part of the grid (the first rule is used only if constraints
+           for the rows and for the cols require the same number of moves, since search stops, when constraints for the cols are satisfied);
+           a cell, that has less than two neighbours (one for the finish cell), which are not avoided or visited or are the current cell,
+           must be avoided.
+       Deductions, made for the previous cells of the path, remain true, so only lines and neighbours of the cells,
+       which were visited since the last propagation, and of the cells, which status is changed, are checked.
+       Cells, that are not connected with the current cell, aren't deduced here (see get_pruning_rule).
+       Finally, if some cell, that must be visited, is adjacent to the current cell and has no other neighbours for entrance,
+       then the next move is forced to it.
+       Input:
+           cell - tuple of two integers: current cell, that is not the finish cell or constraints are not satisfied yet;
+           state - dictionary represented the state of search (see create_search_state) with statuses of the cells.
+       Output:
+           if constraints are contradictory, the function will return None;
+           otherwise the function will return tuple of two integers: cell of the forced move, or False, if the move isn't forced."""
+    num_cols = state['num_cols']
+    finish = state['finish']
+    finish_index = finish[1]*num_cols + finish[0]
+    cell_index = cell[1]*num_cols + cell[0]
+    status = state['status']
+    if cell_index == finish_index or status[finish_index] == 3 or state['rows_total'] < state['cols_total']:
+        return None
+    cols_constr = state['cols_constr']
+    rows_constr = state['rows_constr']
+    num_rows = state['num_rows']
+    line_cells = state['line_cells']
+    cell_lines = state['cell_lines']
+    neighbours = state['neighbours']
+    possible_counts = state['possible_counts']
+    must_visit_counts = state['must_visit_counts']
+    degrees = state['degrees']
+    trail = state['trail']
+    line_queued = state['line_queued']
+    cell_queued = state['cell_queued']
+    moves = state['moves']
+    propagated = state['propagated']
+    rows_exact = state['rows_total'] == state['cols_total']
+    current_neighbours = neighbours[cell_index]
+    # lines and cells, that should be checked
+    if propagated:
+        new_moves = moves[propagated[-1] - 1:]
+        lines_to_check = [line for (index, previous_status) in new_moves[1:] for line in cell_lines[index]]
+        cells_to_check = [next_index for (index, previous_status) in new_moves for next_index in neighbours[index]]
+    else:
+        lines_to_check = list(range(len(line_cells)))
+        cells_to_check = list(range(len(status)))
+    for line in lines_to_check:
+        line_queued[line] = 1
+    for index in cells_to_check:
+        cell_queued[index] = 1
+    contradiction = False
+    while lines_to_check or cells_to_check:
+        if lines_to_check:
+            line = lines_to_check.pop()
+            line_queued[line] = 0
+            if line < num_cols:
+                constr, exact = cols_constr[line], True
+            else:
+                part, row = divmod(line - num_cols, num_rows)
+                constr, exact = rows_constr[part][row], rows_exact
+            num_possible = possible_counts[line]
+            num_must_visit = must_visit_counts[line]
+            if num_must_visit > constr or (exact and num_possible < constr):
+                contradiction = True
+                break
+            if num_possible == num_must_visit:
+                continue
+            if exact and num_possible == constr:
+                new_status = 1
+            elif num_must_visit == constr:
+                new_status = 2
+            else:
+                continue
+            changed_indexes = [index for index in line_cells[line] if status[index] == 0]
+        else:
+            index = cells_to_check.pop()
+            cell_queued[index] = 0
+            if status[index] >= 2:
+                continue
+            num_neighbours = degrees[index]
+            if index in current_neighbours:
+                num_neighbours += 1
+            if num_neighbours >= (1 if index == finish_index else 2):
+                continue
+            if status[index] == 1:
+                contradiction = True
+                break
+            new_status = 2
+            changed_indexes = [index]
+        for index in changed_indexes:
+            status[index] = new_status
+            trail.append(index)
+            for line in cell_lines[index]:
+                if new_status == 1:
+                    must_visit_counts[line] += 1
+                else:
+                    possible_counts[line] -= 1
+                if not line_queued[line]:
+                    line_queued[line] = 1
+                    lines_to_check.append(line)
+            # the cell, that must be visited, should have enough neighbours,
+            # and neighbours of the cell, that must be avoided, lose one neighbour
+            if new_status == 1:
+                next_indexes = (index,)
+            else:
+                next_indexes = neighbours[index]
+                for next_index in next_indexes:
+                    degrees[next_index] -= 1
+            for next_index in next_indexes:
+                if not cell_queued[next_index]:
+                    cell_queued[next_index] = 1
+                    cells_to_check.append(next_index)
+    if contradiction:
+        for line in lines_to_check:
+            line_queued[line] = 0
+        for index in cells_to_check:
+            cell_queued[index] = 0
+        return None
+    if not propagated or propagated[-1] < len(moves):
+        propagated.append(len(moves))
+    forced_cell = False
+    for next_index in current_neighbours:
+        # the cell must be entered from the current cell
+        if status[next_index] == 1 and degrees[next_index] < (1 if next_index == finish_index else 2):
+            if forced_cell:
+                return None
+            forced_cell = (next_index % num_cols, next_index // num_cols)
+    return forced_cell
+
+def get_neighbour_indexes(index, num_cols, num_rows):
+    """Function that finds indexes of the cells, adjacent to the given cell.
+       Input:
+           index - integer: index of the given cell (row*num_cols + col);
+           num_cols - integer: number of cols of the grid;
+           num_rows - integer: number of rows of the grid.
+       Output:
+           list of integers: indexes of the adjacent cells."""
+    col = index % num_cols
+    neighbour_indexes = []
+    if col + 1 < num_cols:
+        neighbour_indexes.append(index + 1)
+    if col > 0:
+        neighbour_indexes.append(index - 1)
+    if index + num_cols < num_cols*num_rows:
+        neighbour_indexes.append(index + num_cols)
+    if index >= num_cols:
+        neighbour_indexes.append(index - num_cols)
+    return neighbour_indexes
+
+def create_fenwick_tree(values):
+    """Function that creates Fenwick tree for prefix sums of the given values.
+       Input:
+           values - list of integers: given values.
+       Output:
+           list of integers: Fenwick tree, where the element with index i (from 1) keeps sum of values from i - (i & -i) to i - 1."""
+    tree = [0] + list(values)
+    for index in range(1, len(tree)):
+        parent = index + (index & -index)
+        if parent < len(tree):
+            tree[parent] += tree[index]
+    return tree
+
+def add_to_fenwick_tree(tree, index, delta):
+    """Function that adds the given number to the value with the given index in Fenwick tree.
+       Input:
+           tree - list of integers: Fenwick tree (see create_fenwick_tree);
+           index - integer: index of the value (from 0);
+           delta - integer: given number."""
+    index += 1
+    size = len(tree)
+    while index < size:
+        tree[index] += delta
+        index += index & -index
+
+def get_fenwick_prefix_sum(tree, length):
+    """Function that computes sum of the given number of the first values in Fenwick tree.
+       Input:
+           tree - list of integers: Fenwick tree (see create_fenwick_tree);
+           length - integer: number of the first values.
+       Output:
+           integer: sum of the values."""
+    total = 0
+    while length > 0:
+        total += tree[length]
+        length -= length & -length
+    return total
+
+def search_in_parallel(start, finish, cols_in_left_part, cols_constr, left_rows_constr, right_rows_constr, processes = None,
+                       split_depth = 4, node_budget = 100000, prune_interval = 0, stats = None, propagate_interval = 0, table_size = 0):
+    """Function that performs search in a pool of processes. Search is split to subproblems: paths from the start cell
+       with split_depth moves (see split_search). Every subproblem is solved with the budget of nodes,
+       and if the budget is spent, the rest of its subtree is split again to subproblems, that are solved by free processes.
+       Every subproblem has a key: tuple of integers, so that the order of keys is the order of sequential search,
+       and the path of the subproblem with the least key is returned, so the result is the same as for search.
+       Input:
+           start, finish, cols_in_left_part, cols_constr, left_rows_constr, right_rows_constr - the grid and constraints (see search);
+           processes - integer: number of processes in the pool; if None, then the number of CPUs is used;
+           split_depth - integer: number of the first moves, that define initial subproblems;
+           node_budget - integer: maximum number of nodes, visited in one subproblem before splitting of it;
+           prune_interval, stats, propagate_interval, table_size - settings and counters of search (see search);
+               every process has its own transposition table.
+       Output:
+           the same as for search: path from the start cell to the finish cell, or False;
+           when the path is found, other subproblems are cancelled."""
+    instance = (start, finish, cols_in_left_part, cols_constr, left_rows_constr, right_rows_constr)
+    state = create_search_state(*instance)
+    # heap of subproblems, ordered by keys
+    subproblems = [((index,), path) for index, path in enumerate(split_search((start,), state, split_depth))]
+    num_tasks = 2*(processes or multiprocessing.cpu_count())
+    results = queue.Queue()
+    running_keys = set()
+    found_key, found_path = None, False
+    cancelled = multiprocessing.Event()
+    pool = multiprocessing.Pool(processes, initializer = init_search_worker,
+                                initargs = (instance, node_budget, prune_interval, propagate_interval, table_size, cancelled))
+    try:
+        while True:
+            # subproblems after the found path are not solved
+            while subproblems and len(running_keys) < num_tasks and (found_key is None or subproblems[0][0] < found_key):
+                key, path = heapq.heappop(subproblems)
+                running_keys.add(key)
+                pool.apply_async(search_subproblem_in_worker, ((key, path),), callback = results.put, error_callback = results.put)
+            if not running_keys:
+                return found_path
+            result = results.get()
+            if isinstance(result, BaseException):
+                raise result
+            key, path, unexplored, worker_stats = result
+            running_keys.discard(key)
+            if stats is not None:
+                for name in worker_stats:
+                    stats[name] = stats.get(name, 0) + worker_stats[name]
+            if path:
+                if found_key is None or key < found_key:
+                    found_key, found_path = key, path
+            else:
+                for index, unexplored_path in enumerate(unexplored):
+                    heapq.heappush(subproblems, (key + (index,), unexplored_path))
+            # the found path is returned, when all subproblems before it are solved
+            if (found_key is not None and all(running_key > found_key for running_key in running_keys)
+                and (not subproblems or subproblems[0][0] > found_key)):
+                return found_path
+    finally:
+        # subproblems, that are not started yet, are skipped, and started ones are limited by the budget of nodes;
+        # processes are not terminated, since termination of a process, that sends its result, can block the pool
+        cancelled.set()
+        pool.close()
+        pool.join()
+
+def split_search(path, state, split_depth):
+    """Function that splits search from the last cell of the path to subproblems in the order of sequential search.
+       Input:
+           path - tuple of tuples of two integers: path made so far from the start cell;
+           state - dictionary represented the state of search after passage of the path (see create_search_state);
+           split_depth - integer: number of moves, that are added to the path.
+       Output:
+           generator that will generate paths, extended by split_depth moves or ended in the finish cell with satisfied constraints."""
+    cell = path[-1]
+    if split_depth == 0 or (cell == state['finish'] and state['cols_total'] == 0):
+        yield path
+        return
+    num_cols = state['num_cols']
+    for adjacent_cell in get_next_state(cell, state):
+        # we assume, that path is acyclic
+        if not state['visited'] >> (adjacent_cell[1]*num_cols + adjacent_cell[0]) & 1:
+            apply_move(state, adjacent_cell)
+            yield from split_search(path + (adjacent_cell,), state, split_depth - 1)
+            undo_move(state, adjacent_cell)
+
+def init_search_worker(instance, node_budget, prune_interval, propagate_interval, table_size, cancelled):
+    """Function that initializes process of the pool for search_in_parallel.
+       Input:
+           instance - tuple of the start cell, the finish cell, number of cols in the left part of the grid and constraints (see search);
+           node_budget - integer: maximum number of nodes, visited in one subproblem;
+           prune_interval, propagate_interval, table_size - integers: settings of search (see search);
+           cancelled - event, that is set, when results of subproblems are not needed anymore."""
+    worker_settings['instance'] = instance
+    worker_settings['node_budget'] = node_budget
+    worker_settings['prune_interval'] = prune_interval
+    worker_settings['propagate_interval'] = propagate_interval
+    worker_settings['table'] = collections.OrderedDict() if table_size > 0 else None
+    worker_settings['table_size'] = table_size
+    worker_settings['cancelled'] = cancelled
+
+def search_subproblem_in_worker(subproblem):
+    """Function that solves subproblem in the process of the pool, initialized by init_search_worker.
+       Input:
+           subproblem - tuple of the key (tuple of integers) and the path from the start cell.
+       Output:
+           tuple of four elements: the key of the subproblem, the found path or False,
+           list of paths, that start not explored subtrees (see depth_first_search), and counters of search."""
+    key, path = subproblem
+    if worker_settings['cancelled'].is_set():
+        return key, False, [], create_search_stats()
+    state = create_search_state(*worker_settings['instance'], worker_settings['prune_interval'], None, worker_settings['propagate_interval'])
+    # the transposition table is kept in the process for all subproblems
+    state['table'] = worker_settings['table']
+    state['table_size'] = worker_settings['table_size']
+    for cell in path[1:]:
+        apply_move(state, cell)
+    state['node_budget'] = worker_settings['node_budget']
+    found_path = depth_first_search(path, state)
+    return key, found_path, state['unexplored'], state['stats']
+
+def generate_instance(num_cols, num_rows, cols_in_left_part = None, start = None, finish = None, seed = None, unique = True,
+                      max_attempts = 100, node_budget = None, prune_interval = 0, propagate_interval = 1, directness = 0.6,
+                      min_search_nodes = 1000):
+    """Function that generates random grid with constraints for the puzzle Tracks: constraints are computed
+       for a random path from the start cell to the finish cell (see get_random_path).
+       If unique is True, then paths are generated, until the grid has the only path, that satisfies the constraints.
+       Difficulty of the grid is set by two parameters:
+           directness - winding paths, that fill the grid, make grids, that are hard for search, but such grids usually have many paths,
+               and the check of their uniqueness is an exhaustive search, that can take hours already for grids 20x20;
+               paths, directed to the finish cell, leave small constraints for most lines, so the check is fast,
+               but search finds such path fast too;
+           min_search_nodes - grids, that search with default settings solves in less nodes, are rejected,
+               which is checked before uniqueness with this budget of nodes.
+       With default settings search with default settings visits thousands of nodes to solve the generated grid
+       (from 1000 to 700000 for grids 20x20, from 1000 to 50000 for grids 40x40, from 1000 to 3000 for grids 80x80),
+       but the check of uniqueness of a grid 40x40 or 80x80 can take many minutes, if it isn't limited by node_budget;
+       with node_budget 100000 a grid 40x40 is generated in seconds, a grid 80x80 in a minute,
+       but some seeds give no grid in max_attempts attempts; less direct paths or more nodes of search make harder grids,
+       but they are found in much more attempts.
+       Input:
+           num_cols, num_rows - integers: size of the grid;
+           cols_in_left_part - integer: number of cols in the left part of the grid; if None, then a half of cols;
+           start - tuple of two integers: start cell; if None, then the lower left cell (0, 0);
+           finish - tuple of two integers: finish cell; if None, then the upper right cell;
+           seed - seed for the random number generator;
+           unique - boolean: whether the path must be unique;
+           max_attempts - integer: maximum number of generated paths;
+           node_budget - integer: maximum number of nodes in the check of uniqueness (if it is spent, then the path is rejected),
+               or None, if the check isn't limited;
+           prune_interval, propagate_interval - integers: settings of search in the check of uniqueness (see search);
+           directness - float from 0 to 1: probability of the move to the finish cell in the random path (see get_random_path);
+           min_search_nodes - integer: minimum number of nodes, that search with default settings visits to find a path.
+       Output:
+           tuple of two elements:
+               1) tuple of the start cell, the finish cell, number of cols in the left part of the grid,
+                  constraints for the cols and constraints for the rows in the left and in the right parts (arguments of search);
+               2) tuple of tuples of two integers: the generated path."""
+    if cols_in_left_part is None:
+        cols_in_left_part = num_cols // 2
+    if start is None:
+        start = (0, 0)
+    if finish is None:
+        finish = (num_cols - 1, num_rows - 1)
+    generator = random.Random(seed)
+    for attempt in range(max_attempts):
+        path = get_random_path(num_cols, num_rows, start, finish, generator, directness)
+        cols_constr = [0]*num_cols
+        rows_constr = [[0]*num_rows, [0]*num_rows]
+        for (col, row) in path:
+            cols_constr[col] += 1
+            rows_constr[0 if col < cols_in_left_part else 1][row] += 1
+        instance = (start, finish, cols_in_left_part, cols_constr, rows_constr[0], rows_constr[1])
+        if min_search_nodes > 0:
+            # the grid is too easy, if search finds a path before the budget is spent
+            state = create_search_state(*instance)
+            state['node_budget'] = min_search_nodes
+            if depth_first_search((start,), state):
+                continue
+        if not unique:
+            return instance, path
+        state = create_search_state(*instance, prune_interval, None, propagate_interval)
+        state['node_budget'] = node_budget
+        num_paths = 0
+        for found_path in iter_depth_first_search((start,), state):
+            num_paths += 1
+            if num_paths == 2:
+                break
+        # if search is stopped by the budget of nodes, then uniqueness is unknown
+        if num_paths == 1 and not state['unexplored']:
+            return instance, path
+    raise ValueError("Instance is not found in " + str(max_attempts) + " attempts")
+
+def get_random_path(num_cols, num_rows, start, finish, generator, directness = 0):
+    """Function that generates random path between two cells of the grid: the path in the random spanning tree of the grid,
+       built by depth-first search with random order of moves, so the path is long and winding,
+       unless depth-first search prefers moves to the finish cell.
+       Input:
+           num_cols, num_rows - integers: size of the grid;
+           start - tuple of two integers: the first cell of the path;
+           finish - tuple of two integers: the last cell of the path;
+           generator - random number generator (random.Random);
+           directness - float from 0 to 1: probability, that depth-first search makes the move, that is the closest to the finish cell,
+               instead of a random move.
+       Output:
+           tuple of tuples of two integers: path from the start cell to the finish cell."""
+    parents = {start: None}
+    cells_stack = [start]
+    while cells_stack:
+        col, row = cells_stack[-1]
+        next_cells = [(next_col, next_row) for (next_col, next_row) in ((col + 1, row), (col - 1, row), (col, row + 1), (col, row - 1))
+                      if 0 <= next_col < num_cols and 0 <= next_row < num_rows and (next_col, next_row) not in parents]
+        if next_cells:
+            next_cell = generator.choice(next_cells)
+            if directness > 0 and generator.random() < directness:
+                # ties are broken randomly
+                next_cell = min(next_cells, key = lambda cell: (abs(cell[0] - finish[0]) + abs(cell[1] - finish[1]), generator.random()))
+            parents[next_cell] = (col, row)
+            cells_stack.append(next_cell)
+        else:
+            cells_stack.pop()
+    path = [finish]
+    while path[-1] != start:
+        path.append(parents[path[-1]])
+    return tuple(reversed(path))
+
+# settings of the process of the pool (see init_search_worker)
+worker_settings = {}
 
 # number of cols in the left part of the grid
 cols_in_left_part = 8
@@ -158,19 +1011,25 @@ def extract_message(grid, path):
        Input:
            grid - tuple of tuples of the same size, that consist of integers:
                   representation of the given grid, where 0 denotes an empty cell;
-           path - tuple of tuples of two integers: path from the corresponding grid of the puzzle.
+           path - tuple of tuples of two integers: path from the corresponding grid of the puzzle,
+                  or integer: bitset of the cells of the path (see create_search_state).
        Output:
            string - exctracted message: if path moved through a cell of the grid and that cell is not empty,
            than the message will have a number from that cell in the corresponding place,
            otherwise there will be '-' character on that place."""
     num_rows = len(grid)
     num_cols = len(grid[0])
+    # False, returned by search, when the path isn't found, is not a bitset
+    if isinstance(path, int) and not isinstance(path, bool):
+        visited = path
+    else:
+        visited = get_path_bitset(path, num_cols)
     message = ''
     # decremental loop for the number of rows
     for row in range(num_rows-1,-1,-1):
         for col in range(num_cols):
             cell_value = grid[row][col]
-            if cell_value > 0 and (col,row) in path:
+            if cell_value > 0 and visited >> (row*num_cols + col) & 1:
                 message += str(cell_value)
             else:
                 message += '-'
@@ -178,6 +1037,18 @@ def extract_message(grid, path):
         message += '\n'
     return message
 
+def get_path_bitset(path, num_cols):
+    """Function that converts the path to the bitset of its cells.
+       Input:
+           path - tuple of tuples of two integers: path in the grid;
+           num_cols - integer: number of cols of the grid.
+       Output:
+           integer: bitset, where the cell (col, row) corresponds to the bit row*num_cols + col."""
+    visited = 0
+    for (col, row) in path:
+        visited |= 1 << (row*num_cols + col)
+    return visited
+
 # bottom grid from the puzzle, where 0 denotes an empty cell
 bottom_grid = ((0,0,8,6,0,8,0,0,0,0,0,0,0,2,0,9),
                (0,1,0,3,0,0,0,1,0,7,0,9,0,0,4,0),
@@ -187,7 +1058,8 @@ bottom_grid = ((0,0,8,6,0,8,0,0,0,0,0,0,0,2,0,9),
                (0,4,0,5,7,0,2,7,8,9,0,8,2,0,0,2))
 
 if __name__ == '__main__':
-    # find path in the upper grid and extract and print corresponding message from the bottom grid of the puzzle
-    path = search(start, finish, cols_in_left_part, cols_constr, left_rows_constr, right_rows_constr)
-    message = extract_message(bottom_grid, path)
+    # find path in the upper grid and extract and print corresponding message from the bottom grid of the puzzle,
+    # using the bitset of the cells of the path from the state of search
+    path, state = search(start, finish, cols_in_left_part, cols_constr, left_rows_constr, right_rows_constr, return_state = True)
+    message = extract_message(bottom_grid, state['visited'])
     print(message)